@@ -1,144 +1,165 @@
-import json
-import random
 import os
+import numpy as np
+import orjson
 
-# Reproducibility
-random.seed(42)
+# Reproducibility: one PCG64 stream for every draw in the generator
+rng = np.random.default_rng(42)
 
-def sat_to_ability_and_gpa(sat_score: int):
+def sat_to_ability_and_gpa(sat_scores):
     """
-    Map SAT score (900–1450) into academic_ability (0.5–0.95)
-    and predicted GPA (1.5–4.0).
+    Map SAT scores (900–1450) into academic_ability (0.5–0.95)
+    and predicted GPA (1.5–4.0). Works on a whole NumPy array at once.
     """
-    normalized = (sat_score - 900) / (1450 - 900)  # normalize to 0–1
-    academic_ability = round(0.5 + normalized * 0.45, 2)
-    predicted_gpa = round(1.5 + normalized * 2.5, 2)
+    normalized = (np.asarray(sat_scores) - 900) / (1450 - 900)  # normalize to 0–1
+    academic_ability = np.round(0.5 + normalized * 0.45, 2)
+    predicted_gpa = np.round(1.5 + normalized * 2.5, 2)
     return academic_ability, predicted_gpa
 
-def get_elective_from_category(course_catalog, category, completed, exclude_labs=False):
+# Base template follows the USF 4-year plan (Fall start).
+# One (required courses, elective slots) pair per semester; an elective slot
+# is (description, category). Built once at import, never mutated.
+USF_TEMPLATE = (
+    (  # Fall - Semester 1
+        ("CIS 1930", "COP 2510", "ENC 1101", "MAC 2311"),
+        (("Natural Science Elective (no lab)", "Science Elective"),),
+    ),
+    (  # Spring - Semester 2
+        ("COP 3514", "ENC 1102", "MAC 2312", "PHY 2048", "PHY 2048L"),
+        (),
+    ),
+    ((), ()),  # Summer - Semester 3 (optional summer - always empty)
+    (  # Fall - Semester 4
+        ("CDA 3201", "CDA 3201L", "COP 4530"),
+        (("General/Unrestricted Elective", "General Elective"),
+         ("General/Unrestricted Elective", "General Elective")),
+    ),
+    (  # Spring - Semester 5
+        ("CDA 3103", "COT 3100", "PHY 2049", "PHY 2049L"),
+        (("Gen-Ed State Humanities (SGEH)", "Gen Ed Humanities"),),
+    ),
+    ((), ()),  # Summer - Semester 6 (optional summer - always empty)
+    (  # Fall - Semester 7
+        ("CDA 4205", "COT 4400"),
+        (("Gen-Ed USF Social Sciences (UGES)", "Gen Ed Social"),
+         ("Major Elective - Software", "Software Elective"),
+         ("Major Elective - Software", "Software Elective"),
+         ("Major Elective - Technical", "Technical Elective")),
+    ),
+    (  # Spring - Semester 8
+        ("CDA 4205L", "EGN 2440", "EGN 4450"),
+        (("AMH/POS (SCIV/SGES)", "Gen Ed Social"),
+         ("Natural Science Elective (no lab)", "Science Elective"),
+         ("Gen-Ed USF Humanities (UGEH)", "Gen Ed Humanities"),
+         ("Major Elective - Software", "Software Elective")),
+    ),
+    ((), ()),  # Summer - Semester 9 (optional summer - always empty)
+    (  # Fall - Semester 10
+        ("CNT 4419", "CEN 4020", "CIS 4250"),
+        (("General/Unrestricted Elective", "General Elective"),
+         ("General/Unrestricted Elective", "General Elective")),
+    ),
+    (  # Spring - Semester 11
+        ("COP 4600",),
+        (("General/Unrestricted Elective", "General Elective"),
+         ("Major Elective - Theory", "Theory Elective"),
+         ("Major Elective - Technical", "Technical Elective"),
+         ("Major Elective - Technical", "Technical Elective")),
+    ),
+)
+
+# Elective slots as (category, exclude_labs); labs are excluded when the
+# description says "no lab"
+TEMPLATE_ELECTIVE_SLOTS = tuple(
+    tuple((category, "no lab" in desc.lower()) for desc, category in electives)
+    for _, electives in USF_TEMPLATE
+)
+
+def compile_template(course_catalog):
+    """
+    Resolve USF_TEMPLATE against a catalog once per run.
+    Returns (required, elective_pools): the required courses of each semester
+    that exist in the catalog, and course codes grouped by
+    (category, exclude_labs) so elective picks never rescan the catalog.
+    """
+    required = tuple(
+        tuple(c for c in courses if c in course_catalog)
+        for courses, _ in USF_TEMPLATE
+    )
+    
+    elective_pools = {}
+    for code, info in course_catalog.items():
+        elective_pools.setdefault((info["category"], False), []).append(code)
+        if not code.endswith('L'):
+            elective_pools.setdefault((info["category"], True), []).append(code)
+    
+    return required, elective_pools
+
+def get_elective_from_category(elective_pools, category, completed, exclude_labs=False):
     """
     Get a random course from a specific category that hasn't been completed.
-    If exclude_labs is True, filter out lab courses (courses ending in 'L').
+    If exclude_labs is True, draw from the pool without lab courses (codes ending in 'L').
     """
-    candidates = [
-        code for code, info in course_catalog.items()
-        if info["category"] == category and code not in completed
-    ]
+    pool = elective_pools.get((category, exclude_labs), [])
+    if not pool:
+        return None
     
-    # Filter out lab courses if requested
-    if exclude_labs:
-        candidates = [c for c in candidates if not c.endswith('L')]
+    # Pools are much larger than a plan's picks, so a uniform draw that
+    # rejects already-completed courses almost always succeeds first try
+    for _ in range(8):
+        code = pool[rng.integers(len(pool))]
+        if code not in completed:
+            return code
     
-    return random.choice(candidates) if candidates else None
+    # Nearly exhausted pool: fall back to filtering it
+    candidates = [c for c in pool if c not in completed]
+    return candidates[rng.integers(len(candidates))] if candidates else None
 
-def generate_study_plan_from_template(course_catalog, admission_term):
+def generate_study_plan_from_template(course_catalog, admission_term, template=None):
     """
     Generate study plan following USF's exact 4-year plan structure.
     For Fall admission: semesters 1-11 directly
     For Spring admission: offset by +1  
     For Summer admission: offset by +2
+    Pass template=compile_template(course_catalog) to reuse it across students.
+    Returns a list: study_plan[s - 1] holds the courses of semester s.
     """
+    required, elective_pools = template or compile_template(course_catalog)
     
-    # Base template follows the USF 4-year plan (Fall start)
-    base_template = {
-        1: {  # Fall - Semester 1
-            "required": ["CIS 1930", "COP 2510", "ENC 1101", "MAC 2311"],
-            "electives": [("Natural Science Elective (no lab)", "Science Elective")]
-        },
-        2: {  # Spring - Semester 2
-            "required": ["COP 3514", "ENC 1102", "MAC 2312", "PHY 2048", "PHY 2048L"],
-            "electives": []
-        },
-        3: {  # Summer - Semester 3
-            "required": [],
-            "electives": []  # Optional summer - always empty
-        },
-        4: {  # Fall - Semester 4
-            "required": ["CDA 3201", "CDA 3201L", "COP 4530"],
-            "electives": [("General/Unrestricted Elective", "General Elective"),
-                         ("General/Unrestricted Elective", "General Elective")]
-        },
-        5: {  # Spring - Semester 5
-            "required": ["CDA 3103", "COT 3100", "PHY 2049", "PHY 2049L"],
-            "electives": [("Gen-Ed State Humanities (SGEH)", "Gen Ed Humanities")]
-        },
-        6: {  # Summer - Semester 6
-            "required": [],
-            "electives": []  # Optional summer - always empty
-        },
-        7: {  # Fall - Semester 7
-            "required": ["CDA 4205", "COT 4400"],
-            "electives": [("Gen-Ed USF Social Sciences (UGES)", "Gen Ed Social"),
-                         ("Major Elective - Software", "Software Elective"),
-                         ("Major Elective - Software", "Software Elective"),
-                         ("Major Elective - Technical", "Technical Elective")]
-        },
-        8: {  # Spring - Semester 8
-            "required": ["CDA 4205L", "EGN 2440", "EGN 4450"],
-            "electives": [("AMH/POS (SCIV/SGES)", "Gen Ed Social"),
-                         ("Natural Science Elective (no lab)", "Science Elective"),
-                         ("Gen-Ed USF Humanities (UGEH)", "Gen Ed Humanities"),
-                         ("Major Elective - Software", "Software Elective")]
-        },
-        9: {  # Summer - Semester 9
-            "required": [],
-            "electives": []  # Optional summer - always empty
-        },
-        10: {  # Fall - Semester 10
-            "required": ["CNT 4419", "CEN 4020", "CIS 4250"],
-            "electives": [("General/Unrestricted Elective", "General Elective"),
-                         ("General/Unrestricted Elective", "General Elective")]
-        },
-        11: {  # Spring - Semester 11
-            "required": ["COP 4600"],
-            "electives": [("General/Unrestricted Elective", "General Elective"),
-                         ("Major Elective - Theory", "Theory Elective"),
-                         ("Major Elective - Technical", "Technical Elective"),
-                         ("Major Elective - Technical", "Technical Elective")]
-        }
-    }
-    
-    study_plan = {}
+    study_plan = []
     completed = set()
     
     # Generate all 11 semesters
-    for sem_num in range(1, 12):
-        template_sem = base_template.get(sem_num, {"required": [], "electives": []})
-        
+    for required_courses, elective_slots in zip(required, TEMPLATE_ELECTIVE_SLOTS):
         semester_courses = []
         
         # Add required courses
-        for course_code in template_sem["required"]:
-            if course_code in course_catalog and course_code not in completed:
+        for course_code in required_courses:
+            if course_code not in completed:
                 semester_courses.append(course_code)
                 completed.add(course_code)
         
         # Add electives
-        for elective_desc, category in template_sem["electives"]:
-            # Check if we should exclude labs (look for "no lab" in description)
-            exclude_labs = "no lab" in elective_desc.lower()
-            elective = get_elective_from_category(course_catalog, category, completed, exclude_labs)
+        for category, exclude_labs in elective_slots:
+            elective = get_elective_from_category(elective_pools, category, completed, exclude_labs)
             if elective:
                 semester_courses.append(elective)
                 completed.add(elective)
         
         # ✅ Always add every semester 1-11 (empty summers included)
-        study_plan[str(sem_num)] = semester_courses
+        study_plan.append(semester_courses)
     
     return study_plan
 
-def generate_student(student_id, admission_term, course_catalog):
+def generate_student(student_id, admission_term, course_catalog,
+                     sat_score, academic_ability, predicted_gpa, dropout_chance,
+                     template=None):
     """
     Generate a synthetic student profile with SAT-based ability & USF study plan.
+    The SAT-driven fields are sampled in bulk by generate_students.
     """
     
-    # 🎯 SAT-driven ability
-    sat_score = random.randint(900, 1450)
-    academic_ability, predicted_gpa = sat_to_ability_and_gpa(sat_score)
-    dropout_chance = round(random.uniform(0.05, 0.2), 2)
-    
     # Generate study plan following USF template
-    study_plan = generate_study_plan_from_template(course_catalog, admission_term)
+    study_plan = generate_study_plan_from_template(course_catalog, admission_term, template)
     
     return {
         "id": student_id,
@@ -149,7 +170,7 @@ def generate_student(student_id, admission_term, course_catalog):
         "admission_term": admission_term,
         "start_term": admission_term,
         "started_in_fall": (admission_term == "Fall"),
-        "study_plan": study_plan,
+        "study_plan": {str(s): courses for s, courses in enumerate(study_plan, start=1)},  # JSON schema the UIs read
         "credits_completed": 0,
         "graduated": False,
         "dropped_out": False,
@@ -162,27 +183,37 @@ def generate_student(student_id, admission_term, course_catalog):
 
 def generate_students(course_catalog, num_per_term=1000):
     """Generate synthetic students across Fall, Spring, Summer with SAT scores."""
-    students = []
-    student_id = 0
     terms = ["Fall", "Spring", "Summer"]
+    num_students = len(terms) * num_per_term
+    admission_terms = [term for term in terms for _ in range(num_per_term)]
     
-    for term in terms:
-        for _ in range(num_per_term):
-            students.append(generate_student(student_id, term, course_catalog))
-            student_id += 1
+    # 🎯 SAT-driven ability, sampled for the whole cohort in one batch
+    sat_scores = rng.integers(900, 1451, size=num_students)
+    academic_abilities, predicted_gpas = sat_to_ability_and_gpa(sat_scores)
+    dropout_chances = np.round(rng.uniform(0.05, 0.2, size=num_students), 2)
     
-    return students
+    template = compile_template(course_catalog)
+    return [
+        generate_student(student_id, term, course_catalog, sat, ability, gpa, dropout, template)
+        for student_id, (term, sat, ability, gpa, dropout) in enumerate(zip(
+            admission_terms,
+            sat_scores.tolist(),
+            academic_abilities.tolist(),
+            predicted_gpas.tolist(),
+            dropout_chances.tolist()
+        ))
+    ]
 
 if __name__ == "__main__":
     os.makedirs("data", exist_ok=True)
     
-    with open("data/course_catalog.json", "r") as f:
-        course_catalog = json.load(f)
+    with open("data/course_catalog.json", "rb") as f:
+        course_catalog = orjson.loads(f.read())
     
     synthetic_students = generate_students(course_catalog, num_per_term=1000)
     
-    with open("data/synthetic_students.json", "w") as f:
-        json.dump(synthetic_students, f, indent=2)
+    with open("data/synthetic_students.json", "wb") as f:
+        f.write(orjson.dumps(synthetic_students, option=orjson.OPT_INDENT_2))
     
     print(f"✅ Generated {len(synthetic_students)} synthetic students")
     print(f"   Following USF CS 4-Year Plan structure")
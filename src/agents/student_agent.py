@@ -1,211 +1,242 @@
-import random
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate
 from mesa import Agent
+from src.model.cohort import NO_GRADE, CohortField
+
+GRADES = ("A", "B", "C", "D", "F")
+GRADE_POINTS = (4.0, 3.0, 2.0, 1.0, 0.0)  # indexed by grade code
+GRADE_CODES = {g: i for i, g in enumerate(GRADES)}
+F_CODE = GRADE_CODES["F"]
+
+@lru_cache(maxsize=None)
+def grade_cdf(predicted_gpa):
+    """
+    Cumulative grade probabilities (A..F) shaped around predicted GPA.
+    The generator rounds predicted GPA to 2 decimals, so a cohort only has a
+    few hundred distinct values and every agent shares the cached tuple.
+    """
+    base = predicted_gpa  # range ~1.5–4.0
+
+    # Probability weights shaped around predicted GPA
+    weights = [
+        max(0.1, (base - 2.0) * 2.0),   # A
+        max(0.1, (base - 1.5) * 1.8),   # B
+        max(0.1, 3.0 - abs(base - 2.5)),# C
+        max(0.1, (2.5 - base) * 1.5),   # D
+        max(0.1, (2.0 - base) * 2.0)    # F
+    ]
+
+    total = sum(weights)
+    cdf = [c / total for c in accumulate(weights)]
+    cdf[-1] = 1.0  # guard against rounding so bisect never runs past "F"
+    return tuple(cdf)
+
+def plan_as_list(study_plan):
+    """
+    Study plan as a list indexed by semester - 1. Generated JSON profiles
+    key semesters by "1".."11"; a list passes through unchanged.
+    """
+    if isinstance(study_plan, list):
+        return study_plan
+    plan = [[]] * max((int(s) for s in study_plan), default=0)
+    for sem_str, courses in study_plan.items():
+        plan[int(sem_str) - 1] = courses
+    return plan
 
 class StudentAgent(Agent):
+    # Scalar state lives in the model's Cohort arrays (row = unique_id)
+    academic_ability = CohortField()
+    predicted_gpa = CohortField()  # SAT-driven predictor
+    dropout_chance = CohortField()
+    credits_completed = CohortField()
+    gpa = CohortField()
+    semester_num = CohortField()
+    low_gpa_streak = CohortField()  # for probation
+    graduated = CohortField()
+    dropped_out = CohortField()
+
     def __init__(self, unique_id, model, profile, course_catalog, core_courses):
         super().__init__(unique_id, model)
-        # Load profile from generator
-        self.profile = profile
+        # Read what the simulation needs from the generator profile once;
+        # the profile dict itself is not kept on the agent
         self.course_catalog = course_catalog
         self.core_courses = core_courses
-
-        # Convenience attributes
-        self.academic_ability = profile["academic_ability"]
-        self.predicted_gpa = profile.get("predicted_gpa", 2.5)  # SAT-driven predictor
-        self.dropout_chance = profile["dropout_chance"]
-        self.study_plan = profile["study_plan"]
         self.admission_term = profile.get("admission_term", "Fall")
 
-        # Progress
-        self.credits_completed = profile.get("credits_completed", 0)
-        self.completed_courses = set(profile.get("completed_courses", []))
-        self.transcript = profile.get("transcript", {})
-        self.repeat_courses = profile.get("repeat_courses", [])
-        self.gpa = profile.get("gpa", 0.0)
+        # Plan as course indices: plan_idx[s - 1] holds semester s
+        course_index = model.courses.index
+        self.plan_idx = tuple(
+            tuple(course_index[c] for c in courses)
+            for courses in plan_as_list(profile["study_plan"])
+        )
+        # Plans that schedule a course before its prerequisites are flagged
+        # (and re-leveled if the model asks for it) once, up front
+        self.plan_out_of_order = bool(model.courses.plan_violations(self.plan_idx))
+        if self.plan_out_of_order and model.reorder_plans:
+            self.plan_idx = model.courses.order_plan(self.plan_idx)
+        self.plan_masks = tuple(model.courses.mask_of(courses) for courses in self.plan_idx)
+
+        # Progress (keyed by course index; see transcript/completed_courses for codes)
+        # Completed courses as an int bitset: bit i set = course i passed
+        self._completed_mask = model.courses.mask_of(
+            course_index[c] for c in profile.get("completed_courses", [])
+        )
+        # Transcript: this student's row of cohort.transcripts (one byte per
+        # course, grade code or NO_GRADE). A memoryview keeps scalar reads and
+        # writes as cheap as a bytearray's while the matrix stays shared.
+        self._transcript = memoryview(model.cohort.transcripts[unique_id])
+        for c, g in profile.get("transcript", {}).items():
+            self._transcript[course_index[c]] = GRADE_CODES[g]
+        # Failed courses waiting for a retake, as a bitset
+        self.repeat_mask = model.courses.mask_of(
+            course_index[c] for c in profile.get("repeat_courses", [])
+        )
+        # Running GPA totals so each semester only adds the new grades
+        graded = [g for g in self._transcript if g != NO_GRADE]
+        self._sum_points = sum(GRADE_POINTS[g] for g in graded)
+        self._count = len(graded)
 
-        # Status flags
-        self.graduated = profile.get("graduated", False)
-        self.dropped_out = profile.get("dropped_out", False)
-
-        # Semester counters
-        self.semester_num = 1
-        self.low_gpa_streak = 0  # for probation
         self.graduation_semester = None
         
         # 🆕 Track blocked courses (for analysis)
         self.blocked_courses = []
+        self.blocked_mask = 0  # every course blocked at least once, as a bitset
         
-        # 🆕 Build course-to-typical-term mapping for smart retakes
-        self.course_typical_term = self._build_course_term_mapping()
+        # 🆕 Which failed courses to retry in which term (smart retakes)
+        self.retry_masks = self._build_retry_masks()
 
-    def check_prerequisites(self, course_code):
-        """
-        Check if student has completed all prerequisites for a course.
-        Returns True if eligible to enroll, False otherwise.
-        """
-        course_info = self.course_catalog.get(course_code, {})
-        prerequisites = course_info.get("prerequisites", [])
-        
-        # Handle courses with multiple prerequisites (must complete ALL)
-        if isinstance(prerequisites, list):
-            return all(prereq in self.completed_courses for prereq in prerequisites)
-        else:
-            # Single prerequisite (shouldn't happen with our catalog, but safe)
-            return prerequisites in self.completed_courses if prerequisites else True
-
-    def _build_course_term_mapping(self):
+        # Grade odds depend only on predicted GPA (shared, memoized table)
+        self._grade_cdf = grade_cdf(self.predicted_gpa)
+
+    @property
+    def completed_courses(self):
+        """Completed course codes."""
+        return set(self.model.courses.codes_in(self._completed_mask))
+
+    @property
+    def transcript(self):
+        """Transcript as {course_code: letter grade}."""
+        codes = self.model.courses.codes
+        return {codes[i]: GRADES[g] for i, g in enumerate(self._transcript) if g != NO_GRADE}
+
+    def _build_retry_masks(self):
         """
-        Build a mapping of which term each course is typically offered in
-        based on the student's study plan.
-        Returns dict: {course_code: term} where term is "Fall", "Spring", or "Summer"
+        Which failed courses may be retried in each term, based on the
+        student's study plan: a course is retried in the term it is first
+        planned in (shifted by admission term); courses outside the plan may
+        be retried in any term.
+        Returns one bitset per term, indexed like model.term_cycle.
         """
-        course_to_term = {}
-        term_cycle = ["Fall", "Spring", "Summer"]
+        term_masks = [0, 0, 0]
+        planned = 0
         
         # Adjust based on admission term
         term_offset = {"Fall": 0, "Spring": 1, "Summer": 2}
         offset = term_offset.get(self.admission_term, 0)
         
-        for sem_str, courses in self.study_plan.items():
-            sem_num = int(sem_str)
+        for sem_idx, courses in enumerate(self.plan_idx):
             # Calculate which term this semester represents
-            term_index = (sem_num - 1 + offset) % 3
-            term = term_cycle[term_index]
+            term_index = (sem_idx + offset) % 3
             
             for course in courses:
-                if course not in course_to_term:  # First occurrence
-                    course_to_term[course] = term
+                bit = 1 << course
+                if not planned & bit:  # First occurrence
+                    term_masks[term_index] |= bit
+                    planned |= bit
         
-        return course_to_term
-    
-    def should_retry_course(self, course_code):
+        # ~planned: unknown typical term, allow retry anytime
+        return tuple(mask | ~planned for mask in term_masks)
+
+    def step(self):
         """
-        Determine if a failed course should be retried this semester based on term matching.
-        Returns True if current model term matches the course's typical term, or if unknown.
+        Advance one semester for this student. The model only steps enrolled
+        students, after the cohort-wide dropout rules (apply_attrition).
         """
-        typical_term = self.course_typical_term.get(course_code)
-        
-        # If we don't know the typical term, allow retry anytime
-        if typical_term is None:
-            return True
-        
-        # Check if current term matches
-        current_term = self.model.current_term
-        return current_term == typical_term
 
-    def step(self):
-        """Advance one semester for this student."""
-        if self.graduated or self.dropped_out:
-            return
-
-        # --- Dropout Logic ---
-        # Early attrition (low ability + early terms)
-        if 2 <= self.semester_num <= 4 and self.academic_ability < 0.65:
-            if random.random() < 0.15:
-                self.dropped_out = True
-                return
-
-        # Academic probation rule
-        if self.semester_num > 3 and self.gpa < 2.0:
-            self.low_gpa_streak += 1
-            if self.low_gpa_streak >= 2:
-                self.dropped_out = True
-                return
-        else:
-            self.low_gpa_streak = 0
-
-        # Stagnation rule (too few credits after 4 semesters)
-        if self.semester_num == 5 and self.credits_completed < 12:
-            self.dropped_out = True
-            return
-
-        # Random late attrition
-        if self.semester_num >= 6 and random.random() < 0.02:
-            self.dropped_out = True
-            return
+        model = self.model
+        courses = model.courses
+        completed = self._completed_mask
 
         # --- Course Enrollment with Prerequisite Checking ---
-        planned_courses = self.study_plan.get(str(self.semester_num), [])
+        semester_num = self.semester_num
+        planned = self.plan_masks[semester_num - 1] if semester_num <= len(self.plan_masks) else 0
         
-        # 🆕 Add repeat courses ONLY if term matches (smarter scheduling)
-        for repeat in list(self.repeat_courses):
-            if repeat not in planned_courses and repeat not in self.completed_courses:
-                if self.should_retry_course(repeat):
-                    planned_courses.append(repeat)
+        # 🆕 Add repeat courses ONLY if term matches (smarter scheduling),
+        # skipping anything already completed
+        retries = self.repeat_mask & self.retry_masks[model.term_index]
+        todo = (planned | retries) & ~completed
         
-        # 🆕 Filter courses by prerequisite eligibility
-        enrollable_courses = []
-        for course_code in planned_courses:
-            # Skip if already completed
-            if course_code in self.completed_courses:
-                continue
-            
-            # 🆕 Check prerequisites
-            if self.check_prerequisites(course_code):
-                enrollable_courses.append(course_code)
-            else:
-                # Track blocked courses for analysis
-                missing_prereqs = [
-                    p for p in self.course_catalog.get(course_code, {}).get("prerequisites", [])
-                    if p not in self.completed_courses
-                ]
-                self.blocked_courses.append({
-                    'semester': self.semester_num,
-                    'term': self.model.current_term,
-                    'course': course_code,
-                    'missing_prereqs': missing_prereqs
-                })
+        # 🆕 Filter courses by prerequisite eligibility (shared across
+        # students in the same position, see UniversityModel.split_by_prereqs)
+        enrollable_courses, blocked = model.split_by_prereqs(todo, completed)
+        for course_idx, missing_mask in blocked:
+            # Track blocked courses for analysis
+            self.blocked_courses.append({
+                'semester': semester_num,
+                'term': model.current_term,
+                'course': courses.codes[course_idx],
+                'missing_prereqs': courses.codes_in(missing_mask)
+            })
+            self.blocked_mask |= 1 << course_idx
+        model.blocks_this_semester += len(blocked)
 
         # Simulate each enrollable course
-        for course_code in enrollable_courses:
-            grade = self.assign_grade()
-            self.transcript[course_code] = grade
-
-            if grade == "F":
-                if course_code not in self.repeat_courses:
-                    self.repeat_courses.append(course_code)
-            else:
-                self.completed_courses.add(course_code)
-                credits = self.course_catalog.get(course_code, {}).get("credits", 3)
-                self.credits_completed += credits
-                if course_code in self.repeat_courses:
-                    self.repeat_courses.remove(course_code)
-
-        # Update GPA
-        self.update_gpa()
+        self.attempt_courses(enrollable_courses)
 
         # Graduation check
-        if self.credits_completed >= self.model.required_credits and all(
-            c in self.completed_courses for c in self.core_courses
-        ):
+        if (self.credits_completed >= model.required_credits
+                and (model.core_mask & ~self._completed_mask) == 0):
             self.graduated = True
             self.dropped_out = False
             if self.graduation_semester is None:
-                self.graduation_semester = self.semester_num
+                self.graduation_semester = semester_num
+            model.on_graduate(self)
 
-        self.semester_num += 1
+        self.semester_num = semester_num + 1
 
-    def assign_grade(self):
-        """Assign grade influenced by predicted GPA from SAT."""
-        grades = ["A", "B", "C", "D", "F"]
-        base = self.predicted_gpa  # range ~1.5–4.0
+    def attempt_courses(self, course_idxs):
+        """
+        Numeric core of a semester: grade every enrolled course, bank credits
+        for passes, queue failures for a retake, then refresh the GPA.
+        """
+        passed = []
+        for course_idx, grade_code in zip(course_idxs, self.assign_grades(len(course_idxs))):
+            # A retake replaces the earlier grade in the GPA
+            previous = self._transcript[course_idx]
+            if previous == NO_GRADE:
+                self._count += 1
+            else:
+                self._sum_points -= GRADE_POINTS[previous]
+            self._sum_points += GRADE_POINTS[grade_code]
+            self._transcript[course_idx] = grade_code
 
-        # Probability weights shaped around predicted GPA
-        weights = [
-            max(0.1, (base - 2.0) * 2.0),   # A
-            max(0.1, (base - 1.5) * 1.8),   # B
-            max(0.1, 3.0 - abs(base - 2.5)),# C
-            max(0.1, (2.5 - base) * 1.5),   # D
-            max(0.1, (2.0 - base) * 2.0)    # F
-        ]
+            bit = 1 << course_idx
+            if grade_code == F_CODE:
+                self.repeat_mask |= bit
+            else:
+                self._completed_mask |= bit
+                passed.append(course_idx)
+                self.repeat_mask &= ~bit
+
+        if passed:
+            self.credits_completed += int(self.model.courses.credits[passed].sum())
 
-        return random.choices(grades, weights=weights, k=1)[0]
+        # Update GPA
+        self.update_gpa()
+
+    def assign_grades(self, n):
+        """
+        Assign n grade codes (indices into GRADES) influenced by predicted GPA
+        from SAT. The model pre-samples this semester's grades for the whole
+        cohort; only a student taking more courses than that draws the rest here.
+        """
+        grades = self.model.grade_draws[self.unique_id]
+        if n <= len(grades):
+            return grades[:n].tolist()
+        cdf = self._grade_cdf
+        return grades.tolist() + [bisect(cdf, u) for u in self.model.rng.random(n - len(grades)).tolist()]
 
     def update_gpa(self):
-        """Recalculate GPA from transcript."""
-        mapping = {"A": 4.0, "B": 3.0, "C": 2.0, "D": 1.0, "F": 0.0}
-        if not self.transcript:
-            self.gpa = 0.0
-            return
-        points = [mapping[g] for g in self.transcript.values()]
-        self.gpa = round(sum(points) / len(points), 2)
\ No newline at end of file
+        """Refresh GPA from the running grade-point totals (unrounded; exports round it)."""
+        self.gpa = self._sum_points / self._count if self._count else 0.0
\ No newline at end of file
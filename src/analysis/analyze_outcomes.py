@@ -1,4 +1,6 @@
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # plots are only saved, never shown
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
@@ -23,42 +25,36 @@ def analyze_student_outcomes(file_path="data/student_outcomes.csv"):
     print(f"Dropped Out: {dropout_count}")
     print(f"Still Enrolled: {enrolled_count}")
 
-    # --- Histograms ---
+    # --- Plots: one 2x2 figure, saved once (headless Agg backend) ---
     sns.set_style("whitegrid")
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
 
     # Credits distribution
-    plt.figure(figsize=(8,5))
-    sns.histplot(df["credits_completed"], bins=20, kde=False)
-    plt.title("Distribution of Credits Completed")
-    plt.xlabel("Credits Completed")
-    plt.ylabel("Number of Students")
-    plt.savefig("data/credits_distribution.png")
-    plt.show()
+    sns.histplot(df["credits_completed"], bins=20, kde=False, ax=axes[0, 0])
+    axes[0, 0].set_title("Distribution of Credits Completed")
+    axes[0, 0].set_xlabel("Credits Completed")
+    axes[0, 0].set_ylabel("Number of Students")
 
     # GPA distribution
-    plt.figure(figsize=(8,5))
-    sns.histplot(df["gpa"], bins=20, kde=True)
-    plt.title("Distribution of GPA")
-    plt.xlabel("GPA")
-    plt.ylabel("Number of Students")
-    plt.savefig("data/gpa_distribution.png")
-    plt.show()
+    sns.histplot(df["gpa"], bins=20, kde=True, ax=axes[0, 1])
+    axes[0, 1].set_title("Distribution of GPA")
+    axes[0, 1].set_xlabel("GPA")
+    axes[0, 1].set_ylabel("Number of Students")
 
     # Outcomes breakdown
-    plt.figure(figsize=(6,6))
     labels = ["Graduated", "Dropped Out", "Still Enrolled"]
     sizes = [grad_count, dropout_count, enrolled_count]
-    plt.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=140)
-    plt.title("Final Outcomes")
-    plt.savefig("data/outcome_pie.png")
-    plt.show()
+    axes[1, 0].pie(sizes, labels=labels, autopct="%1.1f%%", startangle=140)
+    axes[1, 0].set_title("Final Outcomes")
 
     # GPA vs Credits
-    plt.figure(figsize=(8,5))
-    sns.scatterplot(data=df, x="credits_completed", y="gpa", hue="graduated")
-    plt.title("GPA vs Credits Completed")
-    plt.savefig("data/gpa_vs_credits.png")
-    plt.show()
+    sns.scatterplot(data=df, x="credits_completed", y="gpa", hue="graduated", ax=axes[1, 1])
+    axes[1, 1].set_title("GPA vs Credits Completed")
+
+    fig.tight_layout()
+    fig.savefig("data/outcomes_dashboard.png", dpi=120)
+    plt.close(fig)
+    print("✅ Saved plots to data/outcomes_dashboard.png")
 
 if __name__ == "__main__":
     analyze_student_outcomes()
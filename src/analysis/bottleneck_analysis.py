@@ -2,7 +2,6 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import json
-from collections import Counter
 
 def analyze_bottlenecks():
     """
@@ -61,13 +60,16 @@ def analyze_bottlenecks():
     print("2. PREREQUISITE BOTTLENECKS (Courses Blocking Others)")
     print("="*70)
     
-    prereq_blocks = Counter()
-    for prereqs in blocked_df['missing_prereqs'].dropna():
-        if prereqs:
-            prereq_blocks.update(prereqs.split(', '))
+    # One row per (blockage, missing prereq), counted in a single pass
+    prereq_blocks = (
+        blocked_df['missing_prereqs'].dropna()
+        .str.split(', ')
+        .explode()
+        .value_counts()
+    )
     
     print("\nTop 15 Prerequisites Causing Blockages:")
-    for prereq, count in prereq_blocks.most_common(15):
+    for prereq, count in prereq_blocks.head(15).items():
         info = catalog.get(prereq, {})
         print(f"   {prereq:12s} {info.get('name', 'Unknown'):45s} | {count:4d} times")
     
@@ -123,10 +125,7 @@ def analyze_bottlenecks():
     
     # Find courses that are both blocked AND block others
     blocked_courses = set(blocked_df['blocked_course'].unique())
-    blocking_prereqs = set()
-    for prereqs in blocked_df['missing_prereqs'].dropna():
-        if prereqs:
-            blocking_prereqs.update(prereqs.split(', '))
+    blocking_prereqs = set(prereq_blocks.index)
     
     critical_courses = blocked_courses & blocking_prereqs
     
@@ -134,4 +133,7 @@ def analyze_bottlenecks():
     print("(These courses are blocked themselves AND block other courses)")
     for course in sorted(critical_courses):
         info = catalog.get(course, {})
-        blocks_this = len(blocked_df[blocked_df['blocke
\ No newline at end of file
+        blocks_this = course_blocks.loc[course, 'Total Blockages']
+        blocks_others = prereq_blocks[course]
+        print(f"   {course:12s} {info.get('name', 'Unknown'):45s} "
+              f"| blocked {blocks_this:4.0f} times | blocks others {blocks_others:4d} times")
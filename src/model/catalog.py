@@ -0,0 +1,156 @@
+import numpy as np
+
+class CourseTable:
+    """
+    Integer-indexed, struct-of-arrays view of the course catalog.
+    Course i has code codes[i], credits[i], category categories[category_id[i]]
+    and prerequisite indices prereq_idx[i]; code -> i lives in index.
+    Sets of courses are int bitsets (bit i = course i): prereq_closure[i]
+    holds every course that must come before course i, and prereq_mask[i]
+    the minimal set to check, i.e. the listed prerequisites minus those
+    already implied by another listed prerequisite (transitive reduction).
+    """
+    def __init__(self, codes, course_catalog):
+        self.codes = codes
+        self.index = {c: i for i, c in enumerate(codes)}
+
+        infos = [course_catalog.get(c, {}) for c in codes]
+        self.credits = np.array([info.get("credits", 3) for info in infos], dtype=np.int16)
+
+        self.categories = sorted({info.get("category", "") for info in infos})
+        category_ids = {cat: i for i, cat in enumerate(self.categories)}
+        self.category_id = np.array([category_ids[info.get("category", "")] for info in infos], dtype=np.int8)
+
+        self.prereq_idx = [
+            tuple(self.index[p] for p in _as_list(info.get("prerequisites", [])))
+            for info in infos
+        ]
+        self.prereq_closure, self.prereq_mask = _reduce_prerequisites(self.prereq_idx)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def in_category(self, category):
+        """Indices of all courses in a category."""
+        if category not in self.categories:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(self.category_id == self.categories.index(category))
+
+    @staticmethod
+    def mask_of(course_idxs):
+        """Bitset with the bit of every given course index set."""
+        mask = 0
+        for i in course_idxs:
+            mask |= 1 << i
+        return mask
+
+    def plan_violations(self, plan_idx):
+        """
+        Courses a plan schedules before their prerequisites: (semester,
+        course_idx) pairs where a prerequisite is not in an earlier semester.
+        """
+        violations = []
+        earlier = 0
+        for sem_idx, courses in enumerate(plan_idx):
+            for c in courses:
+                if self.prereq_mask[c] & ~earlier:
+                    violations.append((sem_idx + 1, c))
+            earlier |= self.mask_of(courses)
+        return violations
+
+    def order_plan(self, plan_idx):
+        """
+        Topologically re-level a plan: every course moves to the first
+        semester after all of its planned prerequisites, never earlier than
+        originally planned. Prerequisites outside the plan are left to the
+        per-semester check.
+        """
+        planned_in = {}
+        for sem_idx, courses in enumerate(plan_idx):
+            for c in courses:
+                planned_in.setdefault(c, sem_idx)
+
+        level = {}
+        def place(c):
+            if c not in level:
+                level[c] = planned_in[c]  # provisional, also breaks cycles
+                after = [place(p) + 1 for p in self.prereq_idx[c] if p in planned_in]
+                level[c] = max([planned_in[c]] + after)
+            return level[c]
+
+        ordered = [[] for _ in range(max(map(place, planned_in), default=-1) + 1)]
+        for sem_idx, courses in enumerate(plan_idx):
+            for c in courses:
+                if planned_in[c] == sem_idx:
+                    ordered[level[c]].append(c)
+        return tuple(tuple(courses) for courses in ordered)
+
+    def codes_in(self, mask):
+        """Course codes whose bits are set in a bitset, in index order."""
+        codes = []
+        while mask:
+            low = mask & -mask
+            codes.append(self.codes[low.bit_length() - 1])
+            mask ^= low
+        return codes
+
+
+def _as_list(prerequisites):
+    # Catalog entries normally hold a list, but tolerate a single code
+    if isinstance(prerequisites, list):
+        return prerequisites
+    return [prerequisites] if prerequisites else []
+
+
+def _reduce_prerequisites(prereq_idx):
+    """
+    Transitive closure and transitive reduction of the prerequisite graph,
+    both as per-course bitsets. A listed prerequisite is dropped from the
+    reduced set when another listed prerequisite already requires it.
+    Cyclic catalog entries are not reduced: a course on a cycle keeps all of
+    its listed prerequisites, and a prerequisite on a cycle implies nothing
+    (the courses in a loop would otherwise imply each other away).
+    """
+    def reachable(i):
+        mask = 0
+        stack = list(prereq_idx[i])
+        while stack:
+            p = stack.pop()
+            if not mask >> p & 1:
+                mask |= 1 << p
+                stack.extend(prereq_idx[p])
+        return mask
+
+    closure = [reachable(i) for i in range(len(prereq_idx))]
+    on_cycle = [bool(mask >> i & 1) for i, mask in enumerate(closure)]
+
+    reduced = []
+    for i, prereqs in enumerate(prereq_idx):
+        implied = 0
+        if not on_cycle[i]:
+            for p in prereqs:
+                if not on_cycle[p]:
+                    implied |= closure[p]
+        reduced.append(CourseTable.mask_of(prereqs) & ~implied)
+    return closure, reduced
+
+
+def prepare_catalog(course_catalog, extra_codes=()):
+    """
+    Convert the catalog dict into a CourseTable once, so downstream code
+    indexes by int instead of re-reading per-course dicts.
+    Prerequisites and extra_codes missing from the catalog are indexed too,
+    with the catalog defaults (3 credits, no prerequisites).
+    """
+    codes = list(course_catalog)
+    known = set(codes)
+    for info in course_catalog.values():
+        for p in _as_list(info.get("prerequisites", [])):
+            if p not in known:
+                known.add(p)
+                codes.append(p)
+    for c in extra_codes:
+        if c not in known:
+            known.add(c)
+            codes.append(c)
+    return CourseTable(codes, course_catalog)
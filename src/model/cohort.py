@@ -0,0 +1,51 @@
+import numpy as np
+
+NO_GRADE = 255  # transcript slot of a course never attempted
+
+class Cohort:
+    """
+    Struct-of-arrays store for the per-student scalar state of a simulation.
+    Row i belongs to the StudentAgent whose unique_id is i, so cohort-wide
+    metrics are single NumPy reductions instead of loops over agent objects.
+    """
+    def __init__(self, students_data, num_courses):
+        self.size = len(students_data)
+
+        # Static traits from the generator
+        self.academic_ability = np.array([p["academic_ability"] for p in students_data], dtype=np.float64)
+        self.predicted_gpa = np.array([p.get("predicted_gpa", 2.5) for p in students_data], dtype=np.float64)
+        self.dropout_chance = np.array([p["dropout_chance"] for p in students_data], dtype=np.float64)
+
+        # Progress
+        self.credits_completed = np.array([p.get("credits_completed", 0) for p in students_data], dtype=np.int32)
+        self.gpa = np.array([p.get("gpa", 0.0) for p in students_data], dtype=np.float64)
+        self.semester_num = np.ones(self.size, dtype=np.int32)
+        self.low_gpa_streak = np.zeros(self.size, dtype=np.int32)  # for probation
+
+        # Status flags
+        self.graduated = np.array([p.get("graduated", False) for p in students_data], dtype=bool)
+        self.dropped_out = np.array([p.get("dropped_out", False) for p in students_data], dtype=bool)
+
+        # Transcripts: grade code per (student, course index), NO_GRADE if not taken
+        self.transcripts = np.full((self.size, num_courses), NO_GRADE, dtype=np.uint8)
+
+    def enrolled(self):
+        """Boolean mask of students who have neither graduated nor dropped out."""
+        return ~(self.graduated | self.dropped_out)
+
+
+class CohortField:
+    """
+    Agent attribute backed by a Cohort array, so agent code can keep using
+    plain attribute access (self.gpa, self.graduated, ...).
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        return getattr(agent.model.cohort, self.name).item(agent.unique_id)
+
+    def __set__(self, agent, value):
+        getattr(agent.model.cohort, self.name)[agent.unique_id] = value
@@ -1,20 +1,25 @@
+import numpy as np
 from mesa import Model
-from mesa.time import RandomActivation
 from mesa.datacollection import DataCollector
-from src.agents.student_agent import StudentAgent
+from src.agents.student_agent import StudentAgent, grade_cdf, plan_as_list
+from src.model.catalog import prepare_catalog
+from src.model.cohort import Cohort
 
 class UniversityModel(Model):
-    def __init__(self, students_data, course_catalog, required_credits=120):
+    def __init__(self, students_data, course_catalog, required_credits=120, seed=None,
+                 reorder_plans=False):
         super().__init__()
+        self.rng = np.random.default_rng(seed)  # PCG64 stream for all student draws
         self.course_catalog = course_catalog
         self.required_credits = required_credits
-        self.schedule = RandomActivation(self)
+        self.reorder_plans = reorder_plans  # re-level out-of-order study plans
         self.semester_count = 0
         self.running = True
         
         # 🆕 Track current academic term
         self.current_term = "Fall"  # Starting term
         self.term_cycle = ["Fall", "Spring", "Summer"]
+        self.term_index = 0  # index into term_cycle
         
         # Identify CS Core courses (must complete to graduate)
         self.core_courses = [
@@ -22,16 +27,39 @@ class UniversityModel(Model):
             if info.get("category") == "CS Core"
         ]
         
-        # Create student agents
-        for i, profile in enumerate(students_data):
-            student = StudentAgent(
+        # Integer course indices + flat per-course tables for the agents
+        self._index_courses(students_data)
+        
+        # Per-student scalar state, shared with the agents below
+        self.cohort = Cohort(students_data, len(self.courses))
+        
+        # Running status counters, kept current by on_graduate / apply_attrition
+        self.n_graduated = int(np.count_nonzero(self.cohort.graduated))
+        self.n_dropped_out = int(np.count_nonzero(self.cohort.dropped_out))
+        self.n_enrolled = int(np.count_nonzero(self.cohort.enrolled()))
+        self.blocks_this_semester = 0  # 🆕 blockages in the last semester stepped
+        self._split_cache = {}  # (todo, completed) -> split_by_prereqs result
+        
+        # Create student agents; students[i] is row i of the cohort. The
+        # model steps them itself (step_enrolled), no Mesa scheduler needed.
+        self.students = [
+            StudentAgent(
                 unique_id=i,
                 model=self,
                 profile=profile,
                 course_catalog=self.course_catalog,
                 core_courses=self.core_courses
             )
-            self.schedule.add(student)
+            for i, profile in enumerate(students_data)
+        ]
+        self.plans_out_of_order = sum(s.plan_out_of_order for s in self.students)
+        
+        # Grade CDF per student (row = unique_id) and how many grades to
+        # pre-sample per student each semester: a full plan semester + retakes
+        self.grade_cdf = np.array([grade_cdf(g) for g in self.cohort.predicted_gpa.tolist()]).reshape(-1, 5)
+        self.grade_slots = max(
+            (len(courses) for s in self.students for courses in s.plan_idx), default=0
+        ) + 2
         
         # Collect stats
         self.datacollector = DataCollector(
@@ -46,6 +74,23 @@ class UniversityModel(Model):
             }
         )
     
+    def _index_courses(self, students_data):
+        """
+        Give every course an integer index once (see prepare_catalog), so
+        agents work with ints and flat per-course tables. Courses that only
+        appear in student profiles are indexed too.
+        """
+        referenced = []
+        for profile in students_data:
+            for courses in plan_as_list(profile["study_plan"]):
+                referenced.extend(courses)
+            referenced.extend(profile.get("completed_courses", []))
+            referenced.extend(profile.get("transcript", {}))
+            referenced.extend(profile.get("repeat_courses", []))
+        
+        self.courses = prepare_catalog(self.course_catalog, extra_codes=referenced)
+        self.core_mask = self.courses.mask_of(self.courses.in_category("CS Core").tolist())
+    
     def step(self):
         """Advance simulation by one semester."""
         self.semester_count += 1
@@ -53,32 +98,115 @@ class UniversityModel(Model):
         # 🆕 Update current term (Fall → Spring → Summer → Fall...)
         term_index = (self.semester_count - 1) % 3
         self.current_term = self.term_cycle[term_index]
+        self.term_index = term_index
         
         self.datacollector.collect(self)
-        self.schedule.step()
+        
+        # One buffer of uniforms per semester, row = student:
+        # two attrition draws, then one per pre-sampled grade
+        draws = self.rng.random((self.cohort.size, 2 + self.grade_slots), dtype=np.float32)
+        self.apply_attrition(draws[:, 0], draws[:, 1])
+        self.sample_grades(draws[:, 2:])
+        self.blocks_this_semester = 0
+        self._split_cache.clear()  # keys are only ever reused within a semester
+        self.step_enrolled()
         
         # Stop if no students left
         if self.count_enrolled() == 0:
             self.running = False
     
+    def apply_attrition(self, early_draw, late_draw):
+        """
+        Dropout rules for the whole cohort as array ops, in rule order: a
+        student caught by an earlier rule skips the later ones.
+        """
+        c = self.cohort
+        sem = c.semester_num
+        active = c.enrolled()
+        
+        # Early attrition (low ability + early terms)
+        early = active & (sem >= 2) & (sem <= 4) & (c.academic_ability < 0.65) & (early_draw < 0.15)
+        rest = active & ~early
+        
+        # Academic probation rule
+        low_gpa = rest & (sem > 3) & (c.gpa < 2.0)
+        c.low_gpa_streak[low_gpa] += 1
+        c.low_gpa_streak[rest & ~low_gpa] = 0
+        probation = low_gpa & (c.low_gpa_streak >= 2)
+        
+        # Stagnation rule (too few credits after 4 semesters)
+        stagnation = rest & (sem == 5) & (c.credits_completed < 12)
+        
+        # Random late attrition
+        late = rest & (sem >= 6) & (late_draw < 0.02)
+        
+        dropped = early | probation | stagnation | late
+        c.dropped_out |= dropped
+        
+        n_dropped = int(np.count_nonzero(dropped))
+        self.n_dropped_out += n_dropped
+        self.n_enrolled -= n_dropped
+    
+    def on_graduate(self, student):
+        """Called by a StudentAgent the semester it graduates."""
+        self.n_graduated += 1
+        self.n_enrolled -= 1
+    
+    def split_by_prereqs(self, todo, completed):
+        """
+        Split a bitset of courses to attempt into (enrollable course indices,
+        ((blocked course index, missing prereq bitset), ...)) for a student
+        with the given completed bitset. The answer depends only on those two
+        ints, so students in the same position share one computation.
+        """
+        key = (todo, completed)
+        split = self._split_cache.get(key)
+        if split is None:
+            prereq_mask = self.courses.prereq_mask
+            enrollable, blocked = [], []
+            while todo:
+                low = todo & -todo
+                todo ^= low
+                course_idx = low.bit_length() - 1
+                missing_mask = prereq_mask[course_idx] & ~completed
+                if missing_mask:
+                    blocked.append((course_idx, missing_mask))
+                else:
+                    enrollable.append(course_idx)
+            split = self._split_cache[key] = (tuple(enrollable), tuple(blocked))
+        return split
+    
+    def step_enrolled(self):
+        """
+        Step only the students still enrolled, in random order; graduated
+        and dropped-out agents are never dispatched.
+        """
+        students = self.students
+        for i in self.rng.permutation(np.flatnonzero(self.cohort.enrolled())).tolist():
+            students[i].step()
+    
+    def sample_grades(self, u):
+        """
+        Turn this semester's uniforms (one row of grade_slots per student)
+        into grade codes in one vectorized call: the code is the number of
+        CDF entries <= u, i.e. bisect on the student's grade CDF.
+        """
+        self.grade_draws = (u[:, :, None] >= self.grade_cdf[:, None, :]).sum(axis=2, dtype=np.int8)
+    
     # --- Metrics ---
     def count_graduated(self):
-        return sum(1 for s in self.schedule.agents if s.graduated)
+        return self.n_graduated
     
     def count_dropped_out(self):
-        return sum(1 for s in self.schedule.agents if s.dropped_out)
+        return self.n_dropped_out
     
     def count_enrolled(self):
-        return sum(1 for s in self.schedule.agents if not s.graduated and not s.dropped_out)
+        return self.n_enrolled
     
     def avg_gpa(self):
-        gpas = [s.gpa for s in self.schedule.agents if s.gpa > 0]
-        return round(sum(gpas) / len(gpas), 2) if gpas else 0.0
+        gpas = self.cohort.gpa[self.cohort.gpa > 0]
+        return round(float(gpas.mean()), 2) if gpas.size else 0.0
     
     def count_total_blocked(self):
-        """🆕 Count total number of course blockages this semester"""
-        return sum(
-            len([b for b in s.blocked_courses if b['semester'] == self.semester_count])
-            for s in self.schedule.agents
-            if not s.graduated and not s.dropped_out
-        )
\ No newline at end of file
+        """🆕 Number of course blockages in the most recent semester"""
+        return self.blocks_this_semester
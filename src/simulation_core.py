@@ -0,0 +1,242 @@
+"""
+Simulation core: run the model and return plain data (dicts, lists and
+NumPy arrays). Nothing here imports pandas or matplotlib directly; analysis
+and plotting live in src/simulation_runner.py. Run as a module to write the raw
+outcomes to data/simulation_raw.json for analysis in another process
+(RAW=1 python -m src.simulation_runner reads them instead of simulating).
+"""
+import os
+import multiprocessing
+import numpy as np
+import orjson
+from src.model.university_model import UniversityModel
+
+NUM_SEMESTERS = 14
+COUNT_COLUMNS = ["Graduated", "DroppedOut", "Enrolled", "TotalBlocked"]
+MIN_SHARD_SIZE = 5000  # below this a worker process costs more than it saves
+RAW_PATH = "data/simulation_raw.json"
+
+
+def collect_student_records(model, students_data, id_offset=0):
+    """
+    Per-student outcomes and per-blockage records, both as columns
+    ({column: values}), for a finished model. Numeric and flag columns are
+    typed NumPy arrays taken straight from the Cohort; columns copied from
+    the profiles or holding strings and containers stay lists.
+    """
+    c = model.cohort
+    students = model.students
+    blocked = [s.blocked_courses for s in students]
+    gpa = c.gpa.round(2)
+
+    student_records = {
+        "id": np.arange(id_offset, id_offset + c.size, dtype=np.int32),
+        "credits_completed": c.credits_completed.astype(np.int16),
+        "gpa": gpa,
+        "graduated": c.graduated.copy(),
+        "dropped_out": c.dropped_out.copy(),
+        "semesters_enrolled": (c.semester_num - 1).astype(np.int8),
+        # float so students who never graduated can hold NaN
+        "graduation_semester": np.array([s.graduation_semester for s in students], dtype=np.float64),
+        "admission_term": [p.get("admission_term") for p in students_data],
+        "started_in_fall": [p.get("started_in_fall") for p in students_data],
+        "transcript": [s.transcript for s in students],
+        "completed_courses": [list(s.completed_courses) for s in students],
+        "sat_score": [p.get("sat_score") for p in students_data],
+        "academic_ability": c.academic_ability.copy(),
+        # 🆕 Blocking metrics
+        "blocked_courses": blocked,
+        "num_times_blocked": np.array([len(b) for b in blocked], dtype=np.int32),
+        "unique_blocked_courses": np.array([bin(s.blocked_mask).count("1") for s in students], dtype=np.int32),
+    }
+
+    # 🆕 Individual blockages for aggregate analysis, also as columns;
+    # owner is the cohort row of the student behind each blockage
+    flat = [block for blocks in blocked for block in blocks]
+    owner = np.repeat(np.arange(c.size), student_records["num_times_blocked"])
+    all_blocked_courses = {
+        'student_id': (owner + id_offset).astype(np.int32),
+        'semester': np.array([block['semester'] for block in flat], dtype=np.int8),
+        'term': [block['term'] for block in flat],
+        'blocked_course': [block['course'] for block in flat],
+        'missing_prereqs': [block['missing_prereqs'] for block in flat],  # lists; joined only for CSV
+        'student_gpa': gpa[owner],
+        'student_ability': c.academic_ability[owner],
+        'student_graduated': c.graduated[owner],
+    }
+
+    return student_records, all_blocked_courses
+
+
+def concat_columns(tables):
+    """Stack {column: values} tables that share the same columns (arrays stay arrays)."""
+    if not tables:
+        return {}
+    return {
+        col: np.concatenate([table[col] for table in tables])
+        if isinstance(values, np.ndarray) else [v for table in tables for v in table[col]]
+        for col, values in tables[0].items()
+    }
+
+
+def run_cohort(students_data, course_catalog, required_credits=120,
+               num_semesters=NUM_SEMESTERS, seed=None, id_offset=0):
+    """
+    Run one UniversityModel until everyone has left or num_semesters pass.
+    Returns plain data only (picklable, so it can come back from a worker):
+    the collected time series as {column: [value per step]}, the state after
+    the last semester, the number of students with a GPA and the unrounded
+    sum of their GPAs at each collection (so merged shards can average
+    AvgGPA exactly), and the per-student / per-blockage records.
+    """
+    model = UniversityModel(
+        students_data=students_data,
+        course_catalog=course_catalog,
+        required_credits=required_credits,
+        seed=seed
+    )
+
+    graded, gpa_sums = [], []
+    for _ in range(num_semesters):
+        if not model.running:
+            break
+        # Same students avg_gpa() averages, collected at the top of step()
+        gpas = model.cohort.gpa[model.cohort.gpa > 0]
+        graded.append(int(gpas.size))
+        gpa_sums.append(float(gpas.sum()))
+        model.step()
+
+    final = {
+        "Graduated": model.count_graduated(),
+        "DroppedOut": model.count_dropped_out(),
+        "Enrolled": model.count_enrolled(),
+        "TotalBlocked": model.count_total_blocked(),
+        "AvgGPA": model.avg_gpa(),
+        "Graded": int((model.cohort.gpa > 0).sum()),
+        "GPASum": float(model.cohort.gpa[model.cohort.gpa > 0].sum()),
+    }
+
+    history = {col: list(values) for col, values in model.datacollector.model_vars.items()}
+    student_records, all_blocked_courses = collect_student_records(model, students_data, id_offset)
+    return history, final, graded, gpa_sums, student_records, all_blocked_courses
+
+
+def run_one(seed, students_data, course_catalog, required_credits=120, num_semesters=NUM_SEMESTERS):
+    """One seeded replicate of the cohort: per-student outcome columns tagged with the seed."""
+    _, _, _, _, student_records, _ = run_cohort(students_data, course_catalog, required_credits, num_semesters, seed)
+    student_records["replicate"] = np.full(len(student_records["id"]), seed)
+    return student_records
+
+
+# --- Worker processes: shards of one cohort, or whole replicates ---
+_worker_catalog = None
+_worker_students = None
+
+def _init_worker(course_catalog, students_data=None):
+    # Ship the read-only inputs once per worker instead of once per task
+    global _worker_catalog, _worker_students
+    _worker_catalog = course_catalog
+    _worker_students = students_data
+
+def _run_shard(args):
+    shard, required_credits, num_semesters, seed, id_offset = args
+    return run_cohort(shard, _worker_catalog, required_credits, num_semesters, seed, id_offset)
+
+
+def _run_replicate(seed):
+    return run_one(seed, _worker_students, _worker_catalog)
+
+
+def _merge_shards(parts):
+    """Stitch shard outputs back into one cohort-wide result."""
+    longest = max((part[0] for part in parts), key=lambda history: len(history["Semester"]))
+    steps = len(longest["Semester"])
+
+    merged = {col: [0] * steps for col in COUNT_COLUMNS}
+    gpa_sum = [0.0] * steps
+    graded_total = [0] * steps
+
+    for history, final, graded, gpa_sums, _, _ in parts:
+        # A shard that emptied early keeps its final state for the remaining steps
+        pad = steps - len(history["Semester"])
+        for col in COUNT_COLUMNS:
+            tail = [final[col]] * pad
+            if col == "TotalBlocked" and pad:
+                tail = [final[col]] + [0] * (pad - 1)  # nobody left to block
+            merged[col] = [a + b for a, b in zip(merged[col], history[col] + tail)]
+        graded = graded + [final["Graded"]] * pad
+        gpa_sums = gpa_sums + [final["GPASum"]] * pad
+        gpa_sum = [s + g for s, g in zip(gpa_sum, gpa_sums)]
+        graded_total = [t + n for t, n in zip(graded_total, graded)]
+
+    # Rounded once, from the unrounded GPA sums of every shard
+    merged["AvgGPA"] = [round(s / n, 2) if n else 0.0 for s, n in zip(gpa_sum, graded_total)]
+    merged["Semester"] = longest["Semester"]
+    merged["Term"] = longest["Term"]
+    history = {col: merged[col] for col in longest}  # keep the collector's column order
+
+    final = {col: sum(part[1][col] for part in parts) for col in COUNT_COLUMNS}
+    student_records = concat_columns([part[4] for part in parts])
+    all_blocked_courses = concat_columns([part[5] for part in parts])
+    return history, final, student_records, all_blocked_courses
+
+
+def run_cohort_parallel(students_data, course_catalog, required_credits=120,
+                        num_semesters=NUM_SEMESTERS, seed=None, processes=None):
+    """
+    Split the cohort into contiguous shards, run each shard as its own model
+    in a worker process and merge the results; each worker also builds its
+    shard's outcome columns. With a single process this is just run_cohort.
+    By default a shard gets at least MIN_SHARD_SIZE students, so small
+    cohorts skip the pool entirely.
+    """
+    if processes is None:
+        processes = min(os.cpu_count() or 1, len(students_data) // MIN_SHARD_SIZE)
+    processes = min(processes, len(students_data)) or 1
+    if processes == 1:
+        history, final, _, _, student_records, all_blocked_courses = run_cohort(
+            students_data, course_catalog, required_credits, num_semesters, seed
+        )
+        return history, final, student_records, all_blocked_courses
+
+    size, extra = divmod(len(students_data), processes)
+    tasks, start = [], 0
+    for i in range(processes):
+        end = start + size + (1 if i < extra else 0)
+        shard_seed = None if seed is None else seed + i
+        tasks.append((students_data[start:end], required_credits, num_semesters, shard_seed, start))
+        start = end
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(course_catalog,)) as pool:
+        parts = pool.map(_run_shard, tasks)
+    return _merge_shards(parts)
+
+
+def run_replicates(students_data, course_catalog, seeds, processes=None):
+    """Run one replicate per seed across worker processes; outcome columns stacked in seed order."""
+    with multiprocessing.Pool(processes or os.cpu_count(), initializer=_init_worker,
+                              initargs=(course_catalog, students_data)) as pool:
+        return concat_columns(pool.map(_run_replicate, seeds))
+
+
+def load_inputs():
+    """Synthetic students and course catalog from data/."""
+    with open("data/synthetic_students.json", "rb") as f:
+        students_data = orjson.loads(f.read())
+    with open("data/course_catalog.json", "rb") as f:
+        course_catalog = orjson.loads(f.read())
+    return students_data, course_catalog
+
+
+if __name__ == "__main__":
+    students_data, course_catalog = load_inputs()
+    history, final, student_records, all_blocked_courses = run_cohort_parallel(students_data, course_catalog)
+
+    with open(RAW_PATH, "wb") as f:
+        f.write(orjson.dumps({
+            "history": history,
+            "final": final,
+            "student_records": student_records,
+            "blocked_courses": all_blocked_courses,
+        }, option=orjson.OPT_SERIALIZE_NUMPY))
+    print(f"✅ Saved raw simulation outcomes to {RAW_PATH}")
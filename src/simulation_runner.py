@@ -1,153 +1,258 @@
-import json
-import matplotlib.pyplot as plt
+import os
+import numpy as np
+import orjson
 import pandas as pd
-from collections import Counter
-from src.model.university_model import UniversityModel
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from src.agents.student_agent import GRADE_CODES
+from src.model.cohort import NO_GRADE
+from src.simulation_core import NUM_SEMESTERS, RAW_PATH, load_inputs, run_cohort_parallel, run_replicates
 
-if __name__ == "__main__":
-    # Load synthetic students (JSON file you generated earlier)
-    with open("data/synthetic_students.json", "r") as f:
-        students_data = json.load(f)
-    
-    # Load course catalog (JSON file we created)
-    with open("data/course_catalog.json", "r") as f:
-        course_catalog = json.load(f)
-    
-    # Initialize model
-    bscs_model = UniversityModel(
-        students_data=students_data,
-        course_catalog=course_catalog,
-        required_credits=120
+NUM_REPLICATES = 1  # > 1 also runs seeded replicates of the whole cohort
+
+
+def load_raw_outcomes(path=RAW_PATH):
+    """
+    history, final, student_records and blocked-course columns as dumped by
+    `python -m src.simulation_core`, in the shape run_cohort_parallel
+    returns them (columns come back as lists; NaN graduation semesters as
+    None, which pandas reads back as NaN).
+    """
+    with open(path, "rb") as f:
+        raw = orjson.loads(f.read())
+    return raw["history"], raw["final"], raw["student_records"], raw["blocked_courses"]
+
+
+def write_csv(df, path, index=False):
+    """
+    CSV export through pyarrow's (multithreaded, C++) writer. List and dict
+    columns are written as JSON, so readers can parse them back with
+    json.loads.
+
+    Not byte-identical to DataFrame.to_csv: the header and every string
+    value are quoted, booleans are written true/false, and integral floats
+    without a trailing .0. pd.read_csv (c and pyarrow engines) reads these
+    files back to the same dtypes and values as the old format, which is
+    what bottleneck_analysis.py, analyze_outcomes.py and the ui/ pages use.
+    """
+    if index:
+        df = df.reset_index()
+    nested = [
+        col for col in df.columns
+        if df[col].dtype == object and len(df) and isinstance(df[col].iloc[0], (list, dict))
+    ]
+    df = df.assign(**{col: [orjson.dumps(v).decode() for v in df[col]] for col in nested})
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def write_outcomes_parquet(df, path):
+    """
+    Columnar copy of the per-student outcomes. The transcript is stored as
+    two parallel list columns (course codes, int8 grade codes) rather than
+    a stringified dict, so it stays queryable.
+    """
+    transcripts = df["transcript"]
+    table = pa.Table.from_pandas(df.drop(columns=["transcript"]), preserve_index=False)
+    table = table.append_column(
+        "transcript_courses",
+        pa.array([list(t) for t in transcripts], type=pa.list_(pa.string()))
+    )
+    table = table.append_column(
+        "transcript_grades",
+        pa.array([[GRADE_CODES[g] for g in t.values()] for t in transcripts], type=pa.list_(pa.int8()))
     )
+    pq.write_table(table, path, compression="zstd")
+
+
+def write_transcript_matrix(df, course_catalog, path):
+    """
+    Transcripts as one uint8 (student, course) matrix of grade codes
+    (NO_GRADE where a course was not taken), rows in df order, saved with
+    np.save so readers can memory-map it instead of parsing a JSON string
+    per student. The column order (catalog courses, then any others seen in
+    transcripts) is written next to it as <path stem>_courses.json.
+    """
+    transcripts = df["transcript"].tolist()
+    codes = list(course_catalog)
+    codes += sorted({c for t in transcripts for c in t} - set(codes))
+    column = {code: j for j, code in enumerate(codes)}
+    
+    grades = np.full((len(transcripts), len(codes)), NO_GRADE, dtype=np.uint8)
+    rows = np.repeat(np.arange(len(transcripts)), [len(t) for t in transcripts])
+    grades[rows, [column[c] for t in transcripts for c in t]] = [
+        GRADE_CODES[g] for t in transcripts for g in t.values()
+    ]
+    np.save(path, grades)
+    with open(os.path.splitext(path)[0] + "_courses.json", "wb") as f:
+        f.write(orjson.dumps(codes))
+
+
+def plot_summary(results, grad_counts):
+    """2x2 summary figure saved to data/simulation_results.png."""
+    # Imported here so runs without plots never load matplotlib
+    import matplotlib
+    import matplotlib.pyplot as plt
+    
+    print("\n📊 Generating plots...")
+    
+    # Column views selected once for the panels below
+    progress = results.loc[:, ['Enrolled', 'Graduated', 'DroppedOut']]
+    avg_gpa = results['AvgGPA']
+    total_blocked = results['TotalBlocked'] if 'TotalBlocked' in results.columns else None
+    
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10), constrained_layout=True)
+    
+    # Plot 1: Student progression over time
+    progress.plot(ax=axes[0, 0])
+    axes[0, 0].set_title("Student Progression Over Time")
+    axes[0, 0].set_xlabel("Semester")
+    axes[0, 0].set_ylabel("Number of Students")
+    axes[0, 0].legend(['Enrolled', 'Graduated', 'Dropped Out'])
+    
+    # Plot 2: GPA trend
+    avg_gpa.plot(ax=axes[0, 1], color='green')
+    axes[0, 1].set_title("Average GPA Over Time")
+    axes[0, 1].set_xlabel("Semester")
+    axes[0, 1].set_ylabel("GPA")
+    axes[0, 1].set_ylim([0, 4.0])
+    
+    # Plot 3: Graduation timing distribution (empty if nobody graduated)
+    grad_counts.plot(kind='bar', ax=axes[1, 0], color='skyblue')
+    axes[1, 0].set_title("Graduation Timing Distribution")
+    axes[1, 0].set_xlabel("Semester")
+    axes[1, 0].set_ylabel("Number of Graduates")
+    axes[1, 0].set_xticklabels(axes[1, 0].get_xticklabels(), rotation=0)
+    
+    # Plot 4: 🆕 Blocked courses over time
+    if total_blocked is not None:
+        total_blocked.plot(ax=axes[1, 1], color='red')
+        axes[1, 1].set_title("Course Blockages Over Time")
+        axes[1, 1].set_xlabel("Semester")
+        axes[1, 1].set_ylabel("Number of Blockages")
+    
+    # 150 dpi by default; HIRES=1 for the print-quality 300 dpi render
+    fig.savefig("data/simulation_results.png", dpi=300 if os.environ.get("HIRES") == "1" else 150,
+                bbox_inches='tight')
+    print("✅ Saved visualization to data/simulation_results.png")
+    if matplotlib.get_backend().lower() != "agg":
+        plt.show()
+    plt.close(fig)  # headless runs just free the figure
+
+
+def main():
+    # Load synthetic students + course catalog (JSON files generated earlier)
+    students_data, course_catalog = load_inputs()
+    
+    core_courses = [c for c, info in course_catalog.items() if info.get("category") == "CS Core"]
     
     print("🚀 Starting simulation...")
     print(f"   Initial students: {len(students_data)}")
     print(f"   Required credits: 120")
-    print(f"   CS Core courses: {len(bscs_model.core_courses)}")
+    print(f"   CS Core courses: {len(core_courses)}")
     print()
     
-    # Run for up to 14 semesters
-    for step_num in range(14):
-        if not bscs_model.running:
-            print(f"✅ Simulation ended early at semester {step_num}")
-            break
-        bscs_model.step()
-        
-        # Progress updates every 2 semesters
-        if (step_num + 1) % 2 == 0:
-            enrolled = bscs_model.count_enrolled()
-            graduated = bscs_model.count_graduated()
-            dropped = bscs_model.count_dropped_out()
-            print(f"Semester {step_num + 1} ({bscs_model.current_term}): "
-                  f"Enrolled={enrolled}, Graduated={graduated}, Dropped={dropped}")
+    if os.environ.get("RAW") == "1":
+        # Analyse a run dumped by `python -m src.simulation_core` instead of simulating
+        history, final, student_records, all_blocked_courses = load_raw_outcomes()
+        print(f"📂 Loaded raw outcomes from {RAW_PATH}")
+    else:
+        # Run for up to 14 semesters, one shard of the cohort per CPU
+        history, final, student_records, all_blocked_courses = run_cohort_parallel(
+            students_data, course_catalog, required_credits=120, num_semesters=NUM_SEMESTERS
+        )
+    results = pd.DataFrame(history)
+    steps_run = len(results)
+    
+    # Progress every 2 semesters (state after that semester)
+    for step_num in range(2, steps_run + 1, 2):
+        state = results.iloc[step_num] if step_num < steps_run else final
+        print(f"Semester {step_num} ({results['Term'].iloc[step_num - 1]}): "
+              f"Enrolled={state['Enrolled']}, Graduated={state['Graduated']}, Dropped={state['DroppedOut']}")
+    if steps_run < NUM_SEMESTERS:
+        print(f"✅ Simulation ended early at semester {steps_run}")
     
     print("\n" + "="*60)
     print("SIMULATION COMPLETE")
     print("="*60)
     
     # Collect aggregate results
-    results = bscs_model.datacollector.get_model_vars_dataframe()
     results.index.name = "Step"
-    results.to_csv("data/results.csv")
+    write_csv(results, "data/results.csv", index=True)
     print("\n✅ Saved time-series results to data/results.csv")
     
     # --- Save detailed per-student outcomes ---
-    student_records = []
-    all_blocked_courses = []  # 🆕 Collect all blockages for analysis
-    
-    for student, profile in zip(bscs_model.schedule.agents, students_data):
-        # Basic student record
-        record = {
-            "id": student.unique_id,
-            "credits_completed": student.credits_completed,
-            "gpa": student.gpa,
-            "graduated": student.graduated,
-            "dropped_out": student.dropped_out,
-            "semesters_enrolled": student.semester_num - 1,
-            "graduation_semester": getattr(student, "graduation_semester", None),
-            "admission_term": profile.get("admission_term"),
-            "started_in_fall": profile.get("started_in_fall"),
-            "transcript": student.transcript,
-            "completed_courses": list(student.completed_courses),
-            "sat_score": profile.get("sat_score"),
-            "academic_ability": profile.get("academic_ability"),
-            # 🆕 Blocking metrics
-            "blocked_courses": student.blocked_courses,
-            "num_times_blocked": len(student.blocked_courses),
-            "unique_blocked_courses": len(set(b['course'] for b in student.blocked_courses))
-        }
-        student_records.append(record)
-        
-        # 🆕 Collect individual blockages for aggregate analysis
-        for block in student.blocked_courses:
-            all_blocked_courses.append({
-                'student_id': student.unique_id,
-                'semester': block['semester'],
-                'term': block['term'],
-                'blocked_course': block['course'],
-                'missing_prereqs': ', '.join(block['missing_prereqs']),
-                'student_gpa': student.gpa,
-                'student_ability': student.academic_ability,
-                'student_graduated': student.graduated
-            })
-    
-    df = pd.DataFrame(student_records)
-    df.to_csv("data/student_outcomes.csv", index=False)
+    # Arrow-backed columns: nullable ints (graduation_semester) and Arrow
+    # kernels for the groupbys below; list/dict columns stay object
+    df = pd.DataFrame(student_records).convert_dtypes(dtype_backend="pyarrow")
+    write_csv(df, "data/student_outcomes.csv")
     print("✅ Saved detailed student outcomes to data/student_outcomes.csv")
+    write_outcomes_parquet(df, "data/student_outcomes.parquet")
+    print("✅ Saved columnar copy to data/student_outcomes.parquet")
+    write_transcript_matrix(df, course_catalog, "data/transcripts.npy")
+    print("✅ Saved transcript grade matrix to data/transcripts.npy")
     
     # 🆕 Save blocked courses analysis
-    if all_blocked_courses:
-        blocked_df = pd.DataFrame(all_blocked_courses)
-        blocked_df.to_csv("data/blocked_courses.csv", index=False)
+    blocked_df = pd.DataFrame(all_blocked_courses).astype({"term": "category", "blocked_course": "category"})
+    if not blocked_df.empty:
+        write_csv(
+            blocked_df.assign(missing_prereqs=blocked_df["missing_prereqs"].str.join(", ")),
+            "data/blocked_courses.csv"
+        )
         print("✅ Saved blocked courses analysis to data/blocked_courses.csv")
     
+    # --- Replicates: spread of outcomes across seeds ---
+    if NUM_REPLICATES > 1:
+        replicates = pd.DataFrame(run_replicates(students_data, course_catalog, seeds=range(NUM_REPLICATES)))
+        write_csv(replicates, "data/replicate_outcomes.csv")
+        grad_rates = replicates.groupby("replicate")["graduated"].mean() * 100
+        print(f"✅ Saved {NUM_REPLICATES} replicates to data/replicate_outcomes.csv "
+              f"(grad rate {grad_rates.mean():.1f}% ± {grad_rates.std():.1f})")
+    
     # --- Analysis: Graduation Timing ---
     print("\n" + "="*60)
     print("GRADUATION TIMING")
     print("="*60)
-    grad_counts = (
-        df[df["graduated"]]
-        .groupby("graduation_semester")
-        .size()
-        .reindex(range(10, 15), fill_value=0)
-    )
-    for sem, count in grad_counts.items():
-        print(f"   Graduated in {sem} semesters: {count:4d} students")
-    
-    avg_grad_time = df[df["graduated"]]["graduation_semester"].mean()
-    print(f"\n   Average graduation time: {avg_grad_time:.2f} semesters")
+    grad_sems = df.loc[df["graduated"], "graduation_semester"].to_numpy(dtype=np.int64)
+    grad_counts = pd.Series(np.bincount(grad_sems, minlength=15)[10:15], index=range(10, 15))
+    if grad_sems.size:
+        for sem, count in grad_counts.items():
+            print(f"   Graduated in {sem} semesters: {count:4d} students")
+        print(f"\n   Average graduation time: {grad_sems.mean():.2f} semesters")
+    else:
+        print("   No students graduated")
     
     # --- Analysis: Cohort Outcomes ---
     print("\n" + "="*60)
     print("COHORT OUTCOMES (by Admission Term)")
     print("="*60)
-    cohort_stats = df.groupby("admission_term")[["graduated", "dropped_out"]].sum()
-    cohort_stats["still_enrolled"] = (
-        df.groupby("admission_term").size() - cohort_stats["graduated"] - cohort_stats["dropped_out"]
+    cohort_stats = df.groupby("admission_term", observed=True).agg(
+        graduated=("graduated", "sum"),
+        dropped_out=("dropped_out", "sum"),
+        total=("graduated", "size"),
+    )
+    cohort_stats.insert(
+        2, "still_enrolled",
+        cohort_stats["total"] - cohort_stats["graduated"] - cohort_stats["dropped_out"]
     )
-    cohort_stats["total"] = df.groupby("admission_term").size()
     cohort_stats["grad_rate"] = (cohort_stats["graduated"] / cohort_stats["total"] * 100).round(1)
     print(cohort_stats)
     
     # 🆕 --- Analysis: Bottleneck Courses ---
-    if all_blocked_courses:
+    if not blocked_df.empty:
         print("\n" + "="*60)
         print("TOP 10 BOTTLENECK COURSES (Most Frequently Blocked)")
         print("="*60)
-        blocked_counter = Counter(b['blocked_course'] for b in all_blocked_courses)
-        for course, count in blocked_counter.most_common(10):
+        blocked_counts = blocked_df["blocked_course"].value_counts()
+        for course, count in blocked_counts.head(10).items():
             course_name = course_catalog.get(course, {}).get('name', 'Unknown')
             print(f"   {course:12s} ({course_name:40s}): {count:4d} blockages")
         
         print("\n" + "="*60)
         print("TOP 10 MISSING PREREQUISITES (Most Common Blockers)")
         print("="*60)
-        prereq_counter = Counter()
-        for b in all_blocked_courses:
-            prereqs = b['missing_prereqs'].split(', ') if b['missing_prereqs'] else []
-            prereq_counter.update(prereqs)
-        
-        for prereq, count in prereq_counter.most_common(10):
+        prereq_counts = blocked_df["missing_prereqs"].explode().value_counts()
+        for prereq, count in prereq_counts.head(10).items():
             prereq_name = course_catalog.get(prereq, {}).get('name', 'Unknown')
             print(f"   {prereq:12s} ({prereq_name:40s}): {count:4d} times")
     
@@ -171,44 +276,14 @@ if __name__ == "__main__":
         avg_blocks = blocked['num_times_blocked'].mean()
         print(f"   Average blockages per affected student: {avg_blocks:.2f}")
     
-    # --- Visualization ---
-    print("\n📊 Generating plots...")
-    
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-    
-    # Plot 1: Student progression over time
-    results[['Enrolled', 'Graduated', 'DroppedOut']].plot(ax=axes[0, 0])
-    axes[0, 0].set_title("Student Progression Over Time")
-    axes[0, 0].set_xlabel("Semester")
-    axes[0, 0].set_ylabel("Number of Students")
-    axes[0, 0].legend(['Enrolled', 'Graduated', 'Dropped Out'])
-    
-    # Plot 2: GPA trend
-    results['AvgGPA'].plot(ax=axes[0, 1], color='green')
-    axes[0, 1].set_title("Average GPA Over Time")
-    axes[0, 1].set_xlabel("Semester")
-    axes[0, 1].set_ylabel("GPA")
-    axes[0, 1].set_ylim([0, 4.0])
-    
-    # Plot 3: Graduation timing distribution
-    grad_counts.plot(kind='bar', ax=axes[1, 0], color='skyblue')
-    axes[1, 0].set_title("Graduation Timing Distribution")
-    axes[1, 0].set_xlabel("Semester")
-    axes[1, 0].set_ylabel("Number of Graduates")
-    axes[1, 0].set_xticklabels(axes[1, 0].get_xticklabels(), rotation=0)
-    
-    # Plot 4: 🆕 Blocked courses over time
-    if 'TotalBlocked' in results.columns:
-        results['TotalBlocked'].plot(ax=axes[1, 1], color='red')
-        axes[1, 1].set_title("Course Blockages Over Time")
-        axes[1, 1].set_xlabel("Semester")
-        axes[1, 1].set_ylabel("Number of Blockages")
-    
-    plt.tight_layout()
-    plt.savefig("data/simulation_results.png", dpi=300, bbox_inches='tight')
-    print("✅ Saved visualization to data/simulation_results.png")
-    plt.show()
+    # --- Visualization (PLOT=0 skips it, and the matplotlib import) ---
+    if os.environ.get("PLOT", "1") == "1":
+        plot_summary(results, grad_counts)
     
     print("\n" + "="*60)
     print("ALL OUTPUTS SAVED TO data/ DIRECTORY")
-    print("="*60)
\ No newline at end of file
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
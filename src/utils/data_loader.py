@@ -1,15 +1,15 @@
-import json
-import matplotlib.pyplot as plt
+import os
+import orjson
 from src.model.university_model import UniversityModel
 
-if __name__ == "__main__":
+def main():
     # Load synthetic students (JSON file you generated earlier)
-    with open("data/synthetic_students.json", "r") as f:
-        students_data = json.load(f)
+    with open("data/synthetic_students.json", "rb") as f:
+        students_data = orjson.loads(f.read())
 
     # Load course catalog (JSON file we created)
-    with open("data/course_catalog.json", "r") as f:
-        course_catalog = json.load(f)
+    with open("data/course_catalog.json", "rb") as f:
+        course_catalog = orjson.loads(f.read())
 
     # Initialize model with students + course catalog
     bscs_model = UniversityModel(
@@ -32,9 +32,16 @@ if __name__ == "__main__":
     print("Simulation finished ✅")
     print(results.tail(1))  # Final snapshot
 
-    # Plot results
+    # Plot results (PLOT=0 skips it, and the matplotlib import)
+    if os.environ.get("PLOT", "1") != "1":
+        return
+    import matplotlib.pyplot as plt
     results.plot()
     plt.title("Student Progression Over Time")
     plt.xlabel("Semester")
     plt.ylabel("Number of Students")
     plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,103 @@
 import streamlit as st
 import pandas as pd
+import ast
+import io
 import json
-import plotly.graph_objects as go
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from shared import file_version
 
 # --- Page Config ---
 st.set_page_config(page_title="Digital Twin - Course Heatmap", layout="wide")
 st.title("🎓 Student Course Progression Heatmap")
 
 # --- Load Data ---
-@st.cache_data
-def load_data():
+# Declared dtypes for the columns this page reads (no inference pass)
+OUTCOME_DTYPES = {
+    'id': np.int32,
+    'gpa': np.float64,
+    'credits_completed': np.int16,
+    'graduated': 'bool',
+    'dropped_out': 'bool',
+    'admission_term': 'category',
+    'transcript': 'string',
+}
+# Grade matrix written by the simulation runner: uint8 grade codes (index
+# into GRADE_LETTERS, NO_GRADE if not taken) per (student row, course),
+# columns listed in TRANSCRIPT_COURSES_PATH
+TRANSCRIPTS_PATH = "data/transcripts.npy"
+TRANSCRIPT_COURSES_PATH = "data/transcripts_courses.json"
+GRADE_LETTERS = ("A", "B", "C", "D", "F")
+NO_GRADE = 255
+
+def parse_transcript(text):
+    """
+    A transcript cell of the CSV: JSON since the runner writes nested
+    columns that way, a Python dict repr in outputs from older runs
+    (read with ast.literal_eval, never eval). Missing cells, and cells
+    that do not parse to a dict (empty, truncated), are {}.
+    """
+    if not isinstance(text, str):
+        return {}
+    try:
+        transcript = json.loads(text)
+    except ValueError:
+        try:
+            transcript = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return {}
+    return transcript if isinstance(transcript, dict) else {}
+
+def grade_matrix_from_json(transcripts):
+    """Same matrix as TRANSCRIPTS_PATH, parsed from the CSV's transcripts (outputs from older runs)."""
+    parsed = [parse_transcript(t) for t in transcripts]
+    codes = sorted({course for t in parsed for course in t})
+    column = {code: j for j, code in enumerate(codes)}
+    grade_code = {g: i for i, g in enumerate(GRADE_LETTERS)}
+    grades = np.full((len(parsed), len(codes)), NO_GRADE, dtype=np.uint8)
+    rows = np.repeat(np.arange(len(parsed)), [len(t) for t in parsed])
+    grades[rows, [column[c] for t in parsed for c in t]] = [
+        grade_code.get(g, NO_GRADE) for t in parsed for g in t.values()
+    ]
+    return grades, codes
+
+DATA_PATHS = ("data/course_catalog.json", "data/student_outcomes.csv", TRANSCRIPTS_PATH, TRANSCRIPT_COURSES_PATH)
+
+def data_version():
+    """Modification times of the files load_data reads (None if missing), its cache key."""
+    return tuple(file_version(path) for path in DATA_PATHS)
+
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    """
+    Course catalog, student outcomes, and the grade matrix with its course
+    codes, all loaded under one version key so they come from the same run.
+    The runner's matrix is memory-mapped (cache_resource keeps one shared
+    mapping; cache_data would pickle a copy). It is parsed from the CSV
+    instead when it or its course list is missing, older than the CSV (the
+    runner writes it after) or does not match the CSV's rows.
+    """
     try:
         with open("data/course_catalog.json", "r") as f:
             course_catalog = json.load(f)
-        student_outcomes = pd.read_csv("data/student_outcomes.csv")
-        return course_catalog, student_outcomes
+        student_outcomes = pd.read_csv("data/student_outcomes.csv", dtype=OUTCOME_DTYPES, engine="c")
+        grades = transcript_courses = None
+        if 'transcript' in student_outcomes.columns:
+            _, outcomes_mtime, grades_mtime, courses_mtime = version
+            if None not in (grades_mtime, courses_mtime) and min(grades_mtime, courses_mtime) >= outcomes_mtime:
+                grades = np.load(TRANSCRIPTS_PATH, mmap_mode="r")
+                with open(TRANSCRIPT_COURSES_PATH, "r") as f:
+                    transcript_courses = json.load(f)
+            if grades is None or grades.shape != (len(student_outcomes), len(transcript_courses)):
+                grades, transcript_courses = grade_matrix_from_json(student_outcomes['transcript'])
+        return course_catalog, student_outcomes, grades, transcript_courses
     except FileNotFoundError as e:
         st.error(f"Missing file: {e.filename}")
         st.stop()
 
-course_catalog, student_outcomes = load_data()
+version = data_version()
+course_catalog, student_outcomes, grades, transcript_courses = load_data(version)
 
 # Check if transcript column exists
 if 'transcript' not in student_outcomes.columns:
@@ -41,22 +118,7 @@ if 'transcript' not in student_outcomes.columns:
     """)
     st.stop()
 
-# Parse transcript JSON strings - they're stored as strings in CSV
-def parse_transcript(transcript_str):
-    if pd.isna(transcript_str):
-        return {}
-    if isinstance(transcript_str, dict):
-        return transcript_str
-    try:
-        # Remove quotes and parse the string representation of dict
-        return eval(transcript_str) if isinstance(transcript_str, str) else {}
-    except:
-        return {}
-
-student_outcomes['transcript_parsed'] = student_outcomes['transcript'].apply(parse_transcript)
-
 # --- Organize Courses by Category ---
-course_order = []
 categories = [
     "Gen Ed", 
     "Math", 
@@ -71,63 +133,71 @@ categories = [
     "Capstone/Elective"
 ]
 
-for category in categories:
-    courses_in_cat = [code for code, info in course_catalog.items() 
-                      if info.get("category") == category]
-    course_order.extend(sorted(courses_in_cat))
+@st.cache_data
+def compute_course_order(course_catalog):
+    """Course codes grouped by category (in `categories` order), sorted within each."""
+    by_category = {category: [] for category in categories}
+    for code, info in course_catalog.items():
+        by_category.get(info.get("category"), []).append(code)
+    return [code for category in categories for code in sorted(by_category[category])]
+
+course_order = compute_course_order(course_catalog)
 
 # --- Sidebar Filters ---
 st.sidebar.header("Filters")
 
-# Admission term filter
-admission_terms = student_outcomes['admission_term'].unique()
-selected_terms = st.sidebar.multiselect(
-    "Admission Term", 
-    admission_terms, 
-    default=list(admission_terms)
-)
-
-# Status filter
-status_filter = st.sidebar.multiselect(
-    "Student Status",
-    ["Graduated", "Dropped Out", "Enrolled"],
-    default=["Graduated", "Enrolled"]
-)
-
-# Sort options
-sort_by = st.sidebar.selectbox(
-    "Sort Students By",
-    ["GPA (Descending)", "GPA (Ascending)", "Credits Completed", "Student ID"]
-)
-
-# Limit display
-max_students = st.sidebar.slider("Max Students to Display", 10, 500, 100)
+# The filter widgets sit in a form: edits are batched and the page reruns
+# once, on Apply, instead of once per click. Until then they keep their
+# last applied values (the defaults on first load).
+with st.sidebar.form("filters"):
+    # Admission term filter
+    admission_terms = student_outcomes['admission_term'].unique()
+    selected_terms = st.multiselect(
+        "Admission Term", 
+        admission_terms, 
+        default=list(admission_terms)
+    )
+    
+    # Status filter
+    status_filter = st.multiselect(
+        "Student Status",
+        ["Graduated", "Dropped Out", "Enrolled"],
+        default=["Graduated", "Enrolled"]
+    )
+    
+    # Sort options
+    sort_by = st.selectbox(
+        "Sort Students By",
+        ["GPA (Descending)", "GPA (Ascending)", "Credits Completed", "Student ID"]
+    )
+    
+    st.form_submit_button("Apply Filters")
+
+# Nothing can match an empty term or status selection
+if not selected_terms or not status_filter:
+    st.warning("Select at least one admission term and one student status.")
+    st.stop()
 
 # --- Filter Students ---
-filtered_outcomes = student_outcomes[
-    student_outcomes['admission_term'].isin(selected_terms)
-].copy()
+# Only the columns the filters, sort and summary read; the transcript
+# strings stay behind in student_outcomes (the download takes full rows)
+FILTER_COLUMNS = ['id', 'gpa', 'credits_completed', 'graduated', 'dropped_out']
+# isin on the categorical admission_term compares its integer codes
+term_mask = student_outcomes['admission_term'].isin(selected_terms).to_numpy()
+filtered_outcomes = student_outcomes.loc[term_mask, FILTER_COLUMNS]
 
 # Apply status filter
-status_mask = pd.Series([False] * len(filtered_outcomes), index=filtered_outcomes.index)
+graduated = filtered_outcomes['graduated'].to_numpy()
+dropped = filtered_outcomes['dropped_out'].to_numpy()
+status_mask = np.zeros(len(filtered_outcomes), dtype=bool)
 if "Graduated" in status_filter:
-    status_mask |= filtered_outcomes['graduated']
+    status_mask |= graduated
 if "Dropped Out" in status_filter:
-    status_mask |= filtered_outcomes['dropped_out']
+    status_mask |= dropped
 if "Enrolled" in status_filter:
-    status_mask |= (~filtered_outcomes['graduated'] & ~filtered_outcomes['dropped_out'])
+    status_mask |= ~graduated & ~dropped
 
-filtered_outcomes = filtered_outcomes[status_mask].reset_index(drop=True)
-
-# --- Sort Students ---
-if sort_by == "GPA (Descending)":
-    filtered_outcomes = filtered_outcomes.sort_values('gpa', ascending=False)
-elif sort_by == "GPA (Ascending)":
-    filtered_outcomes = filtered_outcomes.sort_values('gpa', ascending=True)
-elif sort_by == "Credits Completed":
-    filtered_outcomes = filtered_outcomes.sort_values('credits_completed', ascending=False)
-else:
-    filtered_outcomes = filtered_outcomes.sort_values('id')
+filtered_outcomes = filtered_outcomes[status_mask]  # index = student_outcomes row labels
 
 # Total students info
 total_students = len(filtered_outcomes)
@@ -142,93 +212,159 @@ if view_mode == "Paginated View":
     start_idx = st.sidebar.number_input("Start from student #", 0, max(0, total_students - students_per_page), 0, step=students_per_page)
     end_idx = min(start_idx + students_per_page, total_students)
     st.sidebar.info(f"Showing students {start_idx} to {end_idx}")
-    filtered_outcomes = filtered_outcomes.iloc[start_idx:end_idx]
+    shown_rows = slice(start_idx, end_idx)
 else:
     # Limit to reasonable number for performance
     max_for_scroll = st.sidebar.slider("Max students to load", 50, 500, 200)
+    shown_rows = slice(0, max_for_scroll)
     if total_students > max_for_scroll:
-        st.warning(f"Showing first {max_for_scroll} of {total_students} students for performance")
-        filtered_outcomes = filtered_outcomes.head(max_for_scroll)
+        if sort_by.startswith("GPA"):
+            st.warning(f"Showing first {max_for_scroll} of {total_students} students for performance")
+        else:
+            # Evenly spaced through the sort order, so the view spans the whole range
+            shown_rows = np.arange(max_for_scroll) * total_students // max_for_scroll
+            st.warning(f"Showing {max_for_scroll} of {total_students} students, evenly spaced, for performance")
+
+# --- Sort Students ---
+# Ties on the sort key are broken by ascending id, so a page always holds
+# the same students. For GPA sorts only the first shown_rows.stop students
+# of the order are displayed: np.partition finds the cut-off GPA in O(N)
+# and only the students up to it (all ties at the cut-off included) get
+# sorted.
+if sort_by.startswith("GPA"):
+    gpas = filtered_outcomes['gpa'].to_numpy(dtype=np.float64)
+    ids = filtered_outcomes['id'].to_numpy()
+    if sort_by == "GPA (Descending)":
+        gpas = -gpas
+    k = min(shown_rows.stop, len(gpas))
+    candidates = np.arange(len(gpas))
+    if k < len(gpas):
+        candidates = np.flatnonzero(gpas <= np.partition(gpas, k - 1)[k - 1])
+    top = candidates[np.lexsort((ids[candidates], gpas[candidates]))][:k]
+    filtered_outcomes = filtered_outcomes.iloc[top]
+elif sort_by == "Credits Completed":
+    filtered_outcomes = filtered_outcomes.sort_values(['credits_completed', 'id'], ascending=[False, True])
+else:
+    filtered_outcomes = filtered_outcomes.sort_values('id')
+
+filtered_outcomes = filtered_outcomes.iloc[shown_rows]
 
 # --- Build Heatmap Matrix ---
-grade_to_num = {"A": 4.0, "B": 3.0, "C": 2.0, "D": 1.0, "F": 0.5, "Not Taken": 0}
+HEATMAPGL_MIN_STUDENTS = 150  # above this many columns, prefer the WebGL trace
+PNG_MIN_STUDENTS = 300  # above this many, draw a static image server-side instead
+# Grades as small integer levels (uint8 z-values, one byte per cell)
+grade_to_idx = {"A": 5, "B": 4, "C": 3, "D": 2, "F": 1, "Not Taken": 0}
 grade_colors = {
     0: "#1a1a1a",      # Not taken - black
-    0.5: "#8B0000",    # F - dark red
-    1.0: "#FFB6C1",    # D - light pink
-    2.0: "#90EE90",    # C - light green
-    3.0: "#32CD32",    # B - medium green
-    4.0: "#006400"     # A - dark green
+    1: "#8B0000",      # F - dark red
+    2: "#FFB6C1",      # D - light pink
+    3: "#90EE90",      # C - light green
+    4: "#32CD32",      # B - medium green
+    5: "#006400"       # A - dark green
 }
+# Step colorscale: each level gets a flat band of its colour (both ends of
+# the band carry the same colour), so cells never blend between grades
+grade_colorscale = [
+    [edge / len(grade_colors), grade_colors[level]]
+    for level in range(len(grade_colors))
+    for edge in (level, level + 1)
+]
 
-# Create matrix
-matrix = []
-hover_text = []
-student_labels = []
+# Grade code -> z level / hover letter, as 256-entry lookup tables
+grade_code_levels = np.zeros(256, dtype=np.uint8)
+grade_code_levels[:len(GRADE_LETTERS)] = [grade_to_idx[g] for g in GRADE_LETTERS]
+grade_code_letters = np.full(256, "Not Taken", dtype=object)
+grade_code_letters[:len(GRADE_LETTERS)] = GRADE_LETTERS
+
+@st.cache_data(max_entries=16)
+def build_heatmap_arrays(rows, course_order_key, version):
+    """
+    z (students x courses, uint8 grade levels), hover text and x labels for
+    the student_outcomes rows given, in that order. Keyed on the row labels,
+    course order and data version (everything it reads comes from
+    load_data(version)), so reruns that keep the selection skip the build
+    and a new simulation run rebuilds it.
+    """
+    course_catalog, student_outcomes, grades, transcript_courses = load_data(version)
+    course_order = list(course_order_key)
+    course_names = np.array([course_catalog[code]['name'] for code in course_order], dtype=object)
+    positions = student_outcomes.index.get_indexer(list(rows))  # = rows of the grade matrix
+    student_grades = grades[positions]  # only these rows are read off the mapping
+    # Students with no recorded grades get no column
+    taken = (student_grades != NO_GRADE).any(axis=1)
+    shown = student_outcomes.iloc[positions[taken]]
+
+    # Matrix columns in course_order; courses the matrix lacks read as not taken
+    column = {code: j for j, code in enumerate(transcript_courses)}
+    columns = np.array([column.get(code, -1) for code in course_order])
+    codes = np.where(columns >= 0, student_grades[taken][:, columns], NO_GRADE)
+    matrix = grade_code_levels[codes]
+    grade_letters = grade_code_letters[codes]
+
+    # Per-student strings, formatted once and shared by hover text and labels
+    id_strs = shown['id'].astype(str).to_numpy(dtype=object)
+    gpa_strs = shown['gpa'].map('{:.2f}'.format).to_numpy(dtype=object)
+
+    # Hover text for every (student, course) cell, assembled by broadcasting
+    # per-student and per-course pieces (object arrays of str)
+    student_prefix = "Student " + id_strs
+    course_middle = "<br>" + np.array(course_order, dtype=object) + ": " + course_names + "<br>Grade: "
+    gpa_suffix = "<br>GPA: " + gpa_strs
+    hover_text = (
+        student_prefix[:, None] + course_middle[None, :]
+        + grade_letters + gpa_suffix[:, None]
+    )
 
-for _, student_row in filtered_outcomes.iterrows():
-    student_id = student_row['id']
-    transcript = student_row.get('transcript_parsed', {})
-    
-    # If transcript is empty or not a dict, skip
-    if not isinstance(transcript, dict) or not transcript:
-        continue
-    
-    # Build row for this student
-    student_grades = []
-    student_hover = []
-    
-    for course in course_order:
-        grade = transcript.get(course, "Not Taken")
-        grade_val = grade_to_num.get(grade, 0)
-        student_grades.append(grade_val)
-        
-        # Hover text
-        course_name = course_catalog[course]['name']
-        hover_info = f"Student {student_id}<br>{course}: {course_name}<br>Grade: {grade}<br>GPA: {student_row['gpa']:.2f}"
-        student_hover.append(hover_info)
-    
-    matrix.append(student_grades)
-    hover_text.append(student_hover)
-    
     # Label with status emoji
-    status = "🎓" if student_row['graduated'] else ("❌" if student_row['dropped_out'] else "📚")
-    student_labels.append(f"{status} ID:{student_id} (GPA:{student_row['gpa']:.2f})")
+    statuses = np.select(
+        [shown['graduated'].to_numpy(), shown['dropped_out'].to_numpy()], ["🎓", "❌"], default="📚"
+    ).astype(object)
+    student_labels = (statuses + " ID:" + id_strs + " (GPA:" + gpa_strs + ")").tolist()
+    
+    return matrix, hover_text, student_labels
+
+matrix, hover_text, student_labels = build_heatmap_arrays(tuple(filtered_outcomes.index), tuple(course_order), version)
 
 # --- Create Plotly Heatmap ---
-if matrix:
-    fig = go.Figure(data=go.Heatmap(
-        z=list(zip(*matrix)),  # Transpose the matrix
+# Configure with pan and zoom tools
+HEATMAP_CONFIG = {
+    'scrollZoom': True,
+    'displayModeBar': True,
+    'modeBarButtonsToAdd': ['pan2d', 'zoom2d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d'],
+    'modeBarButtonsToRemove': ['lasso2d', 'select2d']
+}
+
+# The figure is built once per selection and layout: reruns that keep them
+# skip constructing and validating O(students x courses) hover strings.
+# cache_resource returns the figure itself (cache_data would pickle a copy);
+# st.plotly_chart only reads it.
+@st.cache_resource(max_entries=16)
+def heatmap_figure(rows, course_order_key, version, chart_width, chart_height):
+    """Plotly heatmap of build_heatmap_arrays(rows, course_order_key, version)."""
+    import plotly.graph_objects as go  # only sessions that draw a heatmap pay for plotly
+    matrix, hover_text, student_labels = build_heatmap_arrays(rows, course_order_key, version)
+    
+    heatmap_args = dict(
+        z=matrix.T,  # courses x students; a transposed view, no copy
         x=student_labels,  # Students on X-axis
-        y=course_order,  # Courses on Y-axis
-        hovertext=list(zip(*hover_text)),  # Transpose hover text
+        y=list(course_order_key),  # Courses on Y-axis
         hoverinfo='text',
-        colorscale=[
-            [0.0, grade_colors[0]],     # Not taken
-            [0.125, grade_colors[0.5]], # F
-            [0.25, grade_colors[1.0]],  # D
-            [0.5, grade_colors[2.0]],   # C
-            [0.75, grade_colors[3.0]],  # B
-            [1.0, grade_colors[4.0]]    # A
-        ],
-        zmin=0,
-        zmax=4,
+        colorscale=grade_colorscale,
+        zmin=-0.5,  # levels 0..5 land in the middle of their bands
+        zmax=len(grade_colors) - 0.5,
+        zsmooth=False,
         colorbar=dict(
             title="Grade",
-            tickvals=[0, 0.5, 1.0, 2.0, 3.0, 4.0],
+            tickvals=[0, 1, 2, 3, 4, 5],
             ticktext=["Not Taken", "F", "D", "C", "B", "A"]
         )
-    ))
-    
-    # Adjust layout based on view mode
-    if view_mode == "Show All (Scrollable)":
-        chart_width = len(matrix) * 15  # Narrower columns for more students
-        chart_height = 900
-        use_container = False
+    )
+    # Large matrices render with WebGL (heatmapgl takes hover strings as
+    # text). Plotly 6 dropped Heatmapgl, so fall back to Heatmap there.
+    if len(matrix) > HEATMAPGL_MIN_STUDENTS and hasattr(go, "Heatmapgl"):
+        fig = go.Figure(data=go.Heatmapgl(text=hover_text.T, **heatmap_args))
     else:
-        chart_width = 1600
-        chart_height = 1000
-        use_container = True
+        fig = go.Figure(data=go.Heatmap(hovertext=hover_text.T, **heatmap_args))
     
     fig.update_layout(
         title=f"Student Course Performance Matrix ({len(matrix)} students)",
@@ -250,16 +386,54 @@ if matrix:
         margin=dict(l=150, r=50, t=80, b=150),
         dragmode='pan'  # Enable panning by default
     )
+    return fig
+
+@st.cache_data(max_entries=16)
+def heatmap_png(rows, course_order_key, version):
+    """
+    The same heatmap as a PNG drawn server-side with matplotlib (no hover
+    or zoom): one image for the browser instead of O(students x courses)
+    cells and hover strings for plotly.js to lay out.
+    """
+    from matplotlib.colors import ListedColormap
+    from matplotlib.figure import Figure  # no pyplot: nothing global to set up or close
+    matrix, _, _ = build_heatmap_arrays(rows, course_order_key, version)
+    course_order = list(course_order_key)
     
-    # Configure with pan and zoom tools
-    config = {
-        'scrollZoom': True,
-        'displayModeBar': True,
-        'modeBarButtonsToAdd': ['pan2d', 'zoom2d', 'zoomIn2d', 'zoomOut2d', 'autoScale2d', 'resetScale2d'],
-        'modeBarButtonsToRemove': ['lasso2d', 'select2d']
-    }
-    
-    st.plotly_chart(fig, use_container_width=use_container, config=config)
+    fig = Figure(figsize=(max(10, len(matrix) * 0.04), max(6, len(course_order) * 0.2)), constrained_layout=True)
+    ax = fig.subplots()
+    ax.imshow(
+        matrix.T,
+        cmap=ListedColormap([grade_colors[level] for level in range(len(grade_colors))]),
+        vmin=-0.5, vmax=len(grade_colors) - 0.5,  # level i -> colour i
+        aspect="auto", interpolation="nearest"
+    )
+    ax.set_yticks(range(len(course_order)), course_order, fontsize=7)
+    ax.set_xticks([])
+    ax.set_xlabel("Students (in sort order)")
+    ax.set_ylabel("Courses (Ordered by Category)")
+    ax.set_title(f"Student Course Performance Matrix ({len(matrix)} students)")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+if len(matrix):
+    if len(matrix) > PNG_MIN_STUDENTS:
+        st.image(heatmap_png(tuple(filtered_outcomes.index), tuple(course_order), version))
+        st.caption(f"Static image above {PNG_MIN_STUDENTS} students; show fewer for hover details and zoom.")
+    else:
+        # Adjust layout based on view mode
+        if view_mode == "Show All (Scrollable)":
+            chart_width = len(matrix) * 15  # Narrower columns for more students
+            chart_height = 900
+            use_container = False
+        else:
+            chart_width = 1600
+            chart_height = 1000
+            use_container = True
+        
+        fig = heatmap_figure(tuple(filtered_outcomes.index), tuple(course_order), version, chart_width, chart_height)
+        st.plotly_chart(fig, use_container_width=use_container, config=HEATMAP_CONFIG)
     
     # --- Summary Stats ---
     col1, col2, col3, col4 = st.columns(4)
@@ -292,10 +466,18 @@ else:
     st.warning("No students match the selected filters.")
 
 # --- Download Button ---
+@st.cache_data(max_entries=4)
+def filtered_csv_bytes(rows, version):
+    """CSV of the full student_outcomes rows given, written once per selection and data version by pyarrow's C++ writer."""
+    _, student_outcomes, _, _ = load_data(version)
+    buffer = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(student_outcomes.loc[list(rows)], preserve_index=False), buffer)
+    return buffer.getvalue()
+
 if not filtered_outcomes.empty:
     st.download_button(
         label="📥 Download Filtered Student Data",
-        data=filtered_outcomes.to_csv(index=False).encode("utf-8"),
+        data=filtered_csv_bytes(tuple(filtered_outcomes.index), version),
         file_name="filtered_students.csv",
         mime="text/csv"
     )
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Data loading and derived tables shared by the Streamlit pages (app.py,
+dashboard.py). Loads go through st.cache_data keyed on the file's
+modification time, so a rerun reuses the parsed frames and a regenerated
+file is picked up on the next one.
+"""
+import os
+import numpy as np
+import orjson
+import pandas as pd
+import streamlit as st
+
+STUDENTS_PATH = "data/synthetic_students.json"
+OUTCOMES_PATHS = ("data/student_outcomes.parquet", "data/student_outcomes.csv")  # preferred first
+NUM_SEMESTERS = 12  # semesters shown in the progression views
+
+
+def file_version(path):
+    """Modification time of path (None if missing), used as a cache key."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def compact_keys(df):
+    """int32 ids and a categorical admission_term: smaller keys for the merge and groupbys."""
+    return df.astype({"id": "int32", "admission_term": "category"})
+
+
+@st.cache_data
+def load_students(path, version):
+    with open(path, "rb") as file:
+        return compact_keys(pd.DataFrame(orjson.loads(file.read())))
+
+
+@st.cache_data
+def load_outcomes(path, version):
+    """
+    Per-student outcomes; the runner's Parquet copy keeps dtypes and skips
+    the CSV parse. Columns stay Arrow-backed, so NaN never forces a float
+    or object column.
+    """
+    if path.endswith(".parquet"):
+        outcomes = pd.read_parquet(path, dtype_backend="pyarrow")
+    else:
+        outcomes = pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow")
+    return compact_keys(outcomes)
+
+
+@st.cache_data
+def _merge(students_path, students_version, outcomes_path, outcomes_version):
+    students_df = load_students(students_path, students_version)
+    student_outcomes = load_outcomes(outcomes_path, outcomes_version)
+
+    # Lower-case both sides so the shared columns line up (_x = profile, _y = outcome)
+    students_df.columns = students_df.columns.str.lower()
+    student_outcomes.columns = student_outcomes.columns.str.lower()
+    merged_df = pd.merge(students_df, student_outcomes, on="id", how="inner")
+    return merged_df, plan_matrix(merged_df["study_plan"])
+
+
+def load_merged():
+    """
+    Synthetic student profiles merged with their simulated outcomes on id,
+    and the plan_matrix of the merged rows (row i = merged_df.index i).
+    Raises FileNotFoundError if either input is missing.
+    """
+    outcomes_path = next((p for p in OUTCOMES_PATHS if os.path.exists(p)), OUTCOMES_PATHS[-1])
+    return _merge(STUDENTS_PATH, file_version(STUDENTS_PATH), outcomes_path, file_version(outcomes_path))
+
+
+def plan_matrix(study_plans):
+    """
+    Bool (student, semester) matrix, True where the study plan has courses
+    that semester. Built once per load so the views never probe plan dicts.
+    """
+    plans = np.zeros((len(study_plans), NUM_SEMESTERS), dtype=bool)
+    for i, plan in enumerate(study_plans):
+        for sem, courses in plan.items():
+            if int(sem) <= NUM_SEMESTERS:
+                plans[i, int(sem) - 1] = bool(courses)
+    return plans
+
+
+def status_grid(df, plans):
+    """
+    Status per student (row of df) and semester (column) as a string array:
+    graduated and dropped-out students keep that status; otherwise a
+    semester is "Enrolled" if the study plan has courses in it. df is the
+    merged frame or a row subset of it; plans is its plan_matrix.
+    """
+    enrolled = plans[df.index.to_numpy()]
+    return np.where(
+        df["graduated_y"].to_numpy()[:, None], "Graduated",
+        np.where(df["dropped_out_y"].to_numpy()[:, None], "Dropped Out",
+                 np.where(enrolled, "Enrolled", "Not Enrolled"))
+    )